@@ -1,19 +1,34 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.cluster import DBSCAN
 from sklearn.preprocessing import StandardScaler
 from sklearn.neighbors import NearestNeighbors
 import matplotlib.pyplot as plt
 
+# Share the table readers in data_manipulation (CSV, Parquet or Feather inputs)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_manipulation'))
+from table_io import load_table, concat_frames, read_rows
+
+# The only columns the clustering uses; the other survey columns are only read back for the saved anomalies
+COLUMNS = ['Flight line number', 'Longitude', 'Latitude', 'Residual magnetic field (comprehensive model CM4)']
+
+# Neighbourhood graph cached for eps sweeps, and the sweep's table of anomaly counts
+GRAPH_PATH = "../data/processed/vector_data/EPSG_4326/reno_walker_lake_combined_mag_radius_graph.npz"
+SWEEP_PATH = "../data/processed/vector_data/EPSG_4326/reno_walker_lake_combined_mag_dbscan_sweep.csv"
+
 def prepare_data(fp_1, fp_2):
-    df1 = pd.read_csv(fp_1)  
-    df2 = pd.read_csv(fp_2)  
-    
-    # Concatenate datasets into one larger DataFrame
-    df = pd.concat([df1, df2], ignore_index=True)
+    # Load with compact column types (float32 values, small integer line numbers) and concatenate into
+    # one larger DataFrame; the per-file frames are dropped as soon as they are combined
+    df = concat_frames([load_table(fp_1, columns=COLUMNS, compact=True), load_table(fp_2, columns=COLUMNS, compact=True)])
 
     # Prepare the data to include spatial information (Longitude, Latitude) and line index
-    X = df[['Flight line number', 'Longitude', 'Latitude', 'Residual magnetic field (comprehensive model CM4)']]
+    X = df[COLUMNS]
 
     # Normalize the magnetic values only (optional but recommended for DBSCAN)
     scaler = StandardScaler()
@@ -50,14 +65,96 @@ def perform_dbscan(df, X):
     
     return anomalies
 
-def save_anomalies(anomalies):
+def save_anomalies(anomalies, file_paths):
     output_file_path = "../data/processed/vector_data/EPSG_4326/reno_walker_lake_combined_mag_anomalies_dbscan.csv"
-    anomalies.to_csv(output_file_path, index=False)
+    # The clustering only loaded its own columns: read the anomalous rows back in full, with every survey column
+    rows = read_rows(file_paths, anomalies.index)
+    rows['Cluster'] = anomalies['Cluster']
+    rows.to_csv(output_file_path, index=False)
     print(f"Anomalies saved to {output_file_path}")
 
-fp_1 = '../data/processed/vector_data/EPSG_4326/reno_mag.csv'
-fp_2 = '../data/processed/vector_data/EPSG_4326/walker_lake_mag.csv'
-df, X = prepare_data(fp_1, fp_2)
-calculate_k_distance(X)
-# anomalies = perform_dbscan(df, X)
-# save_anomalies(anomalies)
+def build_radius_graph(X, radius, n_jobs=-1):
+    """
+    Build the sparse graph of distances between points closer than radius, with a KD-tree on all cores.
+
+    Returns:
+    scipy.sparse.csr_matrix: n x n distances (a point is not stored as its own neighbour; DBSCAN adds it).
+    """
+    neighbours = NearestNeighbors(radius=radius, algorithm='kd_tree', n_jobs=n_jobs).fit(X)
+    return neighbours.radius_neighbors_graph(mode='distance', sort_results=True).tocsr()
+
+def load_or_build_radius_graph(X, radius, graph_path=GRAPH_PATH, n_jobs=-1):
+    """
+    Return the cached neighbourhood graph if it was built for the same points with at least this radius,
+    otherwise build it and save it (the radius and a fingerprint of the points go in a JSON file next to it).
+    """
+    info_path = f"{os.path.splitext(graph_path)[0]}.json"
+    fingerprint = hashlib.blake2b(np.ascontiguousarray(X).tobytes(), digest_size=16).hexdigest()
+    if os.path.exists(graph_path) and os.path.exists(info_path):
+        with open(info_path) as f:
+            info = json.load(f)
+        if info['radius'] >= radius and info['rows'] == len(X) and info.get('fingerprint') == fingerprint:
+            print(f"Loaded the neighbourhood graph (radius {info['radius']}) from {graph_path}")
+            return sparse.load_npz(graph_path), info['radius']
+
+    graph = build_radius_graph(X, radius, n_jobs)
+    sparse.save_npz(graph_path, graph)
+    with open(info_path, 'w') as f:
+        json.dump({'radius': radius, 'rows': len(X), 'fingerprint': fingerprint, 'edges': int(graph.nnz)}, f)
+    print(f"Built the neighbourhood graph (radius {radius}, {graph.nnz} edges) and saved it to {graph_path}")
+    return graph, radius
+
+def sweep_dbscan(graph, eps_values, min_samples_values):
+    """
+    Run DBSCAN on a precomputed neighbourhood graph for every eps/min_samples pair.
+
+    The graph must have been built with a radius of at least max(eps_values); each run only reads it.
+
+    Returns:
+    pandas.DataFrame: One row per setting with the number of clusters and of anomalies (noise points).
+    """
+    rows = []
+    for eps in eps_values:
+        for min_samples in min_samples_values:
+            labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(graph)
+            anomalies = int(np.count_nonzero(labels == -1))
+            rows.append({
+                'eps': eps,
+                'min_samples': min_samples,
+                'clusters': len(set(labels) - {-1}),
+                'anomalies': anomalies,
+                'anomaly_fraction': anomalies / len(labels),
+            })
+            print(f"eps={eps}, min_samples={min_samples}: {anomalies} anomalies")
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect magnetic anomalies with DBSCAN. Without arguments, plots the k-distance graph for estimating eps.")
+    parser.add_argument('--sweep', action='store_true',
+                        help="Count anomalies for every --eps/--min-samples pair, from one cached neighbourhood graph.")
+    parser.add_argument('--eps', type=float, nargs='+', default=[0.1, 0.14, 0.18, 0.22, 0.26], help="eps values to sweep.")
+    parser.add_argument('--min-samples', type=int, nargs='+', default=[5, 8, 12], help="min_samples values to sweep.")
+    parser.add_argument('--graph', default=GRAPH_PATH, help="Cached neighbourhood graph (.npz).")
+    parser.add_argument('--output', default=SWEEP_PATH, help="Table of anomaly counts per setting.")
+    parser.add_argument('--workers', type=int, default=-1, help="Cores used to build the graph (default: all).")
+    args = parser.parse_args()
+
+    fp_1 = '../data/processed/vector_data/EPSG_4326/reno_mag.csv'
+    fp_2 = '../data/processed/vector_data/EPSG_4326/walker_lake_mag.csv'
+    df, X = prepare_data(fp_1, fp_2)
+
+    if args.sweep:
+        graph, _ = load_or_build_radius_graph(X.to_numpy(dtype='float64'), max(args.eps), args.graph, args.workers)
+        results = sweep_dbscan(graph, sorted(args.eps), sorted(args.min_samples))
+        results.to_csv(args.output, index=False)
+        print(results.to_string(index=False))
+        print(f"Sweep results saved to {args.output}")
+        return
+
+    calculate_k_distance(X)
+    # anomalies = perform_dbscan(df, X)
+    # save_anomalies(anomalies, [fp_1, fp_2])
+
+
+if __name__ == '__main__':
+    main()
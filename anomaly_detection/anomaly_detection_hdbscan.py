@@ -1,18 +1,25 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import hdbscan
 from sklearn.preprocessing import StandardScaler
 
+# Share the table readers in data_manipulation (CSV, Parquet or Feather inputs)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_manipulation'))
+from table_io import load_table, concat_frames, read_rows
+
+# The only columns the clustering uses; the other survey columns are only read back for the saved anomalies
+COLUMNS = ['Flight line number', 'Longitude', 'Latitude', 'Residual magnetic field (comprehensive model CM4)']
+
 def prepare_data(fp_1, fp_2):
-    df1 = pd.read_csv(fp_1)  
-    df2 = pd.read_csv(fp_2)  
-    
-    # Concatenate datasets into one larger DataFrame
-    df = pd.concat([df1, df2], ignore_index=True)
+    # Load with compact column types (float32 values, small integer line numbers) and concatenate into
+    # one larger DataFrame; the per-file frames are dropped as soon as they are combined
+    df = concat_frames([load_table(fp_1, columns=COLUMNS, compact=True), load_table(fp_2, columns=COLUMNS, compact=True)])
 
     # Prepare the data to include spatial information (Longitude, Latitude) and line index
-    X = df[['Flight line number', 'Longitude', 'Latitude', 'Residual magnetic field (comprehensive model CM4)']]
+    X = df[COLUMNS]
 
     # Normalize the magnetic values only
     scaler = StandardScaler()
@@ -32,13 +39,16 @@ def perform_hdbscan(df, X):
     
     return anomalies
 
-def save_anomalies(anomalies):
+def save_anomalies(anomalies, file_paths):
     output_file_path = "../data/processed/vector_data/EPSG_4326/reno_walker_lake_combined_mag_anomalies_hdbscan.csv"
-    anomalies.to_csv(output_file_path, index=False)
+    # The clustering only loaded its own columns: read the anomalous rows back in full, with every survey column
+    rows = read_rows(file_paths, anomalies.index)
+    rows['Cluster'] = anomalies['Cluster']
+    rows.to_csv(output_file_path, index=False)
     print(f"Anomalies saved to {output_file_path}")
 
 fp_1 = '../data/processed/vector_data/EPSG_4326/reno_mag.csv'
 fp_2 = '../data/processed/vector_data/EPSG_4326/walker_lake_mag.csv'
 df, X = prepare_data(fp_1, fp_2)
 anomalies = perform_hdbscan(df, X)
-save_anomalies(anomalies)
+save_anomalies(anomalies, [fp_1, fp_2])
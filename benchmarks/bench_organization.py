@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from synthetic_data import generate_dataset
+
+# Import the organizer the same way it is run (from inside data_organization)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_organization'))
+from main import organize, parse_args as parse_organizer_args
+
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.json')
+
+def git_commit():
+    """Return the current commit hash (with a -dirty suffix for uncommitted changes), or 'unknown' outside git."""
+    repo_folder = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_folder,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_folder,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+def run_scale(scale, organizer_argv, repeats=1, keep=False):
+    """
+    Generate a synthetic data folder at one scale and organize it, keeping the best of several runs per handler.
+
+    Returns:
+    dict: Generation time and, for each handler, its metrics (see instrumentation.handler_metrics).
+    """
+    best = {}
+    generation_s = None
+    for _ in range(repeats):
+        root_folder = tempfile.mkdtemp(prefix=f"vrify_bench_{scale}x_")
+        try:
+            start = time.perf_counter()
+            generate_dataset(root_folder, scale)
+            generation_s = time.perf_counter() - start
+
+            results = organize(root_folder, parse_organizer_args(organizer_argv))
+            for name, result in results.items():
+                metrics = result.get('metrics')
+                if metrics and (name not in best or metrics['wall_s'] < best[name]['wall_s']):
+                    best[name] = metrics
+        finally:
+            if keep:
+                print(f"Kept {root_folder}")
+            else:
+                shutil.rmtree(root_folder, ignore_errors=True)
+
+    return {'generation_s': round(generation_s, 3), 'handlers': best}
+
+def print_scaling(scales):
+    """Print files/s and MB/s per handler at each scale, so sub-linear scaling stands out."""
+    names = sorted({name for run in scales.values() for name in run['handlers']})
+    print(f"{'handler':<12}" + ''.join(f"{f'{scale}x files/s':>16}{f'{scale}x MB/s':>13}" for scale in scales))
+    for name in names:
+        row = f"{name:<12}"
+        for run in scales.values():
+            metrics = run['handlers'].get(name, {})
+            row += f"{metrics.get('files_per_s') or 0:>16.2f}{metrics.get('mb_per_s') or 0:>13.2f}"
+        print(row)
+
+def compare(results, baseline, current):
+    """Print each handler's wall time at the largest common scale against a baseline commit."""
+    common = [scale for scale in results[current]['scales'] if scale in results[baseline]['scales']]
+    if not common:
+        print(f"No common scale between {baseline} and {current}.")
+        return
+    scale = max(common, key=int)
+    before = results[baseline]['scales'][scale]['handlers']
+    after = results[current]['scales'][scale]['handlers']
+    print(f"Wall time at {scale}x, {baseline} -> {current}:")
+    for name in sorted(set(before) & set(after)):
+        ratio = after[name]['wall_s'] / before[name]['wall_s'] if before[name]['wall_s'] else float('nan')
+        flag = '  <-- slower' if ratio > 1.1 else ''
+        print(f"  {name:<12}{before[name]['wall_s']:>9.3f} s {after[name]['wall_s']:>9.3f} s  x{ratio:.2f}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data_organization handlers on synthetic data of increasing size.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2, 4],
+                        help="Dataset scales to run; scale N generates 2N files of each type (default: 1 2 4).")
+    parser.add_argument('--repeats', type=int, default=1,
+                        help="Runs per scale; the fastest run of each handler is kept (default: 1).")
+    parser.add_argument('--organizer-args', default='',
+                        help="Options passed on to the organizer, e.g. \"--workers 4 --output-format parquet\".")
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH,
+                        help="JSON file the results are added to, keyed by commit (default: benchmarks/results.json).")
+    parser.add_argument('--compare', metavar='COMMIT',
+                        help="Compare against the results recorded for another commit.")
+    parser.add_argument('--keep', action='store_true',
+                        help="Keep the generated data folders instead of deleting them.")
+    args = parser.parse_args()
+
+    organizer_argv = args.organizer_args.split() + ['--no-manifest']
+    commit = git_commit()
+    scales = {}
+    for scale in args.scales:
+        print(f"Running scale {scale}x...")
+        scales[str(scale)] = run_scale(scale, organizer_argv, args.repeats, args.keep)
+
+    print_scaling(scales)
+
+    # Results from every commit are kept in one file, so runs can be compared across commits
+    results = {}
+    if os.path.exists(args.results):
+        with open(args.results) as f:
+            results = json.load(f)
+    results[commit] = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': f"{platform.machine()} ({os.cpu_count()} CPUs)",
+        'organizer_args': ' '.join(organizer_argv),
+        'scales': scales,
+    }
+    with open(args.results, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results for {commit} written to {args.results}")
+
+    if args.compare:
+        if args.compare in results:
+            compare(results, args.compare, commit)
+        else:
+            print(f"No results recorded for {args.compare}.")
+
+
+if __name__ == '__main__':
+    main()
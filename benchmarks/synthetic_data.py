@@ -0,0 +1,131 @@
+import os
+import numpy as np
+
+# Number of .xyz columns for each survey type (see magnetic_headers / radiometric_headers in process_xyz.py)
+XYZ_COLUMNS = {'mag': 13, 'rad': 21}
+
+def make_geotiff(tiff_path, rows, cols, dtype='float32', epsg=4326, seed=0):
+    """Write a tiled GeoTIFF of random values over a small lon/lat extent, plus a .tif.xml sidecar."""
+    from osgeo import gdal
+
+    gdal_type = gdal.GDT_Float32 if dtype == 'float32' else gdal.GDT_Int16
+    dataset = gdal.GetDriverByName('GTiff').Create(tiff_path, cols, rows, 1, gdal_type, options=['TILED=YES'])
+    fill_raster(dataset, dtype, epsg, seed)
+    dataset = None
+
+    with open(f"{tiff_path}.xml", 'w') as f:
+        f.write("<metadata><idinfo>Synthetic benchmark raster</idinfo></metadata>\n")
+
+def make_ers(ers_path, rows, cols, dtype='float32', epsg=4326, seed=0):
+    """Write an ER Mapper raster (the .ers header plus its extensionless data file) of random values."""
+    from osgeo import gdal
+
+    gdal_type = gdal.GDT_Float32 if dtype == 'float32' else gdal.GDT_Int16
+    dataset = gdal.GetDriverByName('ERS').Create(ers_path, cols, rows, 1, gdal_type)
+    fill_raster(dataset, dtype, epsg, seed)
+    dataset = None
+
+def fill_raster(dataset, dtype, epsg, seed):
+    """Georeference a new raster at 0.001 degree pixels and fill its first band with random values."""
+    from osgeo import osr
+
+    spatial_ref = osr.SpatialReference()
+    spatial_ref.ImportFromEPSG(epsg)
+    dataset.SetProjection(spatial_ref.ExportToWkt())
+    dataset.SetGeoTransform((-117.0, 0.001, 0.0, 40.0, 0.0, -0.001))
+
+    rng = np.random.default_rng(seed)
+    shape = (dataset.RasterYSize, dataset.RasterXSize)
+    values = rng.normal(0, 100, shape).astype(dtype) if dtype == 'float32' else rng.integers(-500, 500, shape, dtype=dtype)
+    dataset.GetRasterBand(1).WriteArray(values)
+
+def make_xyz(folder, survey, kind, rows, seed=0):
+    """
+    Write a flight-line .xyz file named like the real surveys (<survey>_<kind>_data.xyz), with its .jpg and _meta.txt sidecars.
+
+    A few malformed lines (short, and with a non-numeric field) are included so the parser's slow paths are exercised.
+    """
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0, 100, (rows, XYZ_COLUMNS[kind]))
+    data[:, 0] = np.repeat(np.arange(rows // 1000 + 1), 1000)[:rows]   # Flight line number
+    data[:, 1] = np.arange(rows)                                         # Fiducial number
+    data[:, 3] = 200                                                     # Julian day
+    data[:, 4] = 1978                                                    # Year
+    data[:, 5] = rng.uniform(38, 42, rows)                               # Latitude
+    data[:, 6] = rng.uniform(-120, -114, rows)                           # Longitude
+    data[:, 11 if kind == 'mag' else 9] = rng.integers(0, 50, rows)      # Geology (coded)
+    if kind == 'rad':
+        data[:, 10] = rng.integers(0, 4, rows)                           # Quality flag
+
+    base_path = os.path.join(folder, f"{survey}_{kind}")
+    xyz_path = f"{base_path}_data.xyz"
+    integer_columns = [0, 1, 3, 4, 11 if kind == 'mag' else 9] + ([10] if kind == 'rad' else [])
+    fmt = ['%d' if column in integer_columns else '%.4f' for column in range(data.shape[1])]
+    np.savetxt(xyz_path, data, fmt=fmt, delimiter=' ')
+    with open(xyz_path, 'a') as f:
+        f.write("1 2 3\n")
+        f.write(' '.join(['*'] + ['0'] * (data.shape[1] - 1)) + "\n")
+
+    with open(f"{base_path}.jpg", 'wb') as f:
+        f.write(rng.bytes(64 * 1024))
+    with open(f"{base_path}_meta.txt", 'w') as f:
+        f.write(f"Synthetic {kind} survey {survey}: {rows} rows\n")
+    return xyz_path
+
+def make_shapefile(shapefile_path, features, epsg=4326, seed=0):
+    """Write a point shapefile (.shp, .shx, .dbf, .prj) with a numeric attribute, plus a .shp.xml sidecar."""
+    from osgeo import ogr, osr
+
+    spatial_ref = osr.SpatialReference()
+    spatial_ref.ImportFromEPSG(epsg)
+    dataset = ogr.GetDriverByName('ESRI Shapefile').CreateDataSource(shapefile_path)
+    layer = dataset.CreateLayer(os.path.splitext(os.path.basename(shapefile_path))[0], spatial_ref, ogr.wkbPoint)
+    layer.CreateField(ogr.FieldDefn('value', ogr.OFTReal))
+
+    rng = np.random.default_rng(seed)
+    definition = layer.GetLayerDefn()
+    for lon, lat, value in zip(rng.uniform(-120, -114, features), rng.uniform(38, 42, features), rng.normal(0, 1, features)):
+        feature = ogr.Feature(definition)
+        feature.SetField('value', float(value))
+        feature.SetGeometry(ogr.CreateGeometryFromWkt(f"POINT ({lon} {lat})"))
+        layer.CreateFeature(feature)
+    dataset = None
+
+    with open(f"{shapefile_path}.xml", 'w') as f:
+        f.write("<metadata><idinfo>Synthetic benchmark shapefile</idinfo></metadata>\n")
+
+def make_gdb_pair(folder, name, rows, epsg=4326, seed=0):
+    """Write a .gdb.xml metadata file (with its projection element deep in the document) and its point CSV."""
+    rng = np.random.default_rng(seed)
+    with open(os.path.join(folder, f"{name}.gdb.xml"), 'w') as f:
+        f.write('<?xml version="1.0"?>\n<esri:Workspace xmlns:esri="http://www.esri.com/schemas/ArcGIS/10.1">\n')
+        f.write(''.join(f"  <Field><Name>field_{i}</Name></Field>\n" for i in range(1000)))
+        f.write(f'  <SpatialReference><projection wellknown_epsg="{epsg}"/></SpatialReference>\n</esri:Workspace>\n')
+
+    data = np.column_stack([rng.uniform(-120, -114, rows), rng.uniform(38, 42, rows), rng.normal(0, 1, rows)])
+    np.savetxt(os.path.join(folder, f"{name}.csv"), data, fmt='%.6f', delimiter=',', header='Longitude,Latitude,Value', comments='')
+
+def generate_dataset(root_folder, scale=1, seed=0):
+    """
+    Generate a synthetic raw data folder covering every handler.
+
+    At scale 1 there are 2 files of each raster, survey and vector type of a few MB each;
+    the number of files grows linearly with the scale, the size of each file does not.
+
+    Returns:
+    dict: Data type mapped to the number of primary files generated.
+    """
+    for i in range(2 * scale):
+        folder = os.path.join(root_folder, f"survey_{i:03d}")
+        os.makedirs(folder, exist_ok=True)
+        # The two rasters get different base names, as both convert to the same CRS folder
+        make_geotiff(os.path.join(folder, f"grid_tif_{i:03d}.tif"), 512, 512, seed=seed + i)
+        make_ers(os.path.join(folder, f"grid_ers_{i:03d}.ERS"), 512, 512, dtype='int16', seed=seed + i)
+        make_xyz(folder, f"survey{i:03d}", 'mag', 50_000, seed=seed + i)
+        make_xyz(folder, f"survey{i:03d}", 'rad', 50_000, seed=seed + i)
+        make_shapefile(os.path.join(folder, f"points_{i:03d}.shp"), 5_000, seed=seed + i)
+        make_gdb_pair(folder, f"geodatabase_{i:03d}", 20_000, seed=seed + i)
+        with open(os.path.join(folder, f"report_{i:03d}.pdf"), 'wb') as f:
+            f.write(np.random.default_rng(seed + i).bytes(256 * 1024))
+
+    return {data_type: 2 * scale for data_type in ('tiff', 'ers', 'xyz_mag', 'xyz_rad', 'shapefile', 'gdb', 'other')}
@@ -1,16 +1,21 @@
+import os
+import sys
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# Share the table readers in data_manipulation (CSV, Parquet or Feather inputs)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_manipulation'))
+from table_io import load_table, concat_frames
+
 def load_filter_clean_data():
     # Load rad datasets 
-    df1 = pd.read_csv('../data/processed/vector_data/EPSG_4326/reno_rad_cleaned.csv')  
-    df2 = pd.read_csv('../data/processed/vector_data/EPSG_4326/walker_lake_rad_cleaned.csv')  
-
-    # Concatenate datasets into one larger DataFrame
-    df = pd.concat([df1, df2], ignore_index=True)
+    # Loaded with compact column types (float32 values, categorical codes, small integers) and concatenated
+    # into one larger DataFrame; the per-file frames are dropped as soon as they are combined
+    df = concat_frames([load_table('../data/processed/vector_data/EPSG_4326/reno_rad_cleaned.csv', compact=True),
+                        load_table('../data/processed/vector_data/EPSG_4326/walker_lake_rad_cleaned.csv', compact=True)])
 
     # Select the columns for clustering
     features = ['Residual magnetic field value (nanoTeslas)', 'Apparent Thorium (ppm eTh)', 'Apparent Potassium (%)']
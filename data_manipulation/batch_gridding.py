@@ -0,0 +1,188 @@
+import os
+import re
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')  # Previews are written to files; no window is ever opened
+import matplotlib.pyplot as plt
+from table_io import read_table, table_columns, coordinate_columns
+from gridding import GRIDDING_METHODS, SurveyGridder, make_grid_axes, grid_to_geotiff, save_as_geotiff
+
+# Largest grid (in cells) gridded in memory; larger grids are tiled straight to the GeoTIFF, without a preview
+MAX_GRID_CELLS = 4_000_000
+
+def expand_inputs(patterns):
+    """Expand file paths and glob patterns into a sorted list of unique files."""
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches:
+            print(f"No files match {pattern}")
+        files.update(match for match in matches if os.path.isfile(match))
+    return sorted(files)
+
+def read_survey(file_path, columns=None):
+    """
+    Read the coordinates and value columns of a table, reading only those columns.
+
+    Args:
+    file_path (str): CSV, Parquet or Feather table.
+    columns (list): Value columns to read; if None, every numeric column other than the coordinates.
+
+    Returns:
+    tuple: The table (pandas.DataFrame), the (x, y) coordinate column names and the value columns present in it,
+           or None if it has no coordinate columns.
+    """
+    available = table_columns(file_path)
+    coordinates = coordinate_columns(available)
+    if coordinates is None:
+        return None
+
+    if columns is None:
+        df = read_table(file_path)
+        values = [column for column in df.select_dtypes('number').columns if column not in coordinates]
+        return df, coordinates, values
+
+    values = [column for column in columns if column in available and column not in coordinates]
+    missing = [column for column in columns if column not in available]
+    if missing:
+        print(f"{file_path} has no column(s) {', '.join(missing)}; skipping them.")
+    wanted = list(coordinates) + values
+    if file_path.lower().endswith('.csv'):
+        df = read_table(file_path, usecols=wanted)
+    else:
+        df = read_table(file_path, columns=wanted)
+    return df, coordinates, values
+
+def save_preview(xi, yi, Zi, title, legend_label, output_path):
+    """Save a PNG preview of a grid."""
+    fig, ax = plt.subplots(figsize=(10, 8))
+    heatmap = ax.pcolormesh(xi, yi, Zi, cmap='hsv', shading='auto')
+    fig.colorbar(heatmap, ax=ax).set_label(legend_label)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.set_title(title)
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+def clean_name(text):
+    """Replace the characters that are not safe in a file name with underscores."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(text))
+
+def output_base_names(files):
+    """
+    Give every input table a distinct base name for its outputs.
+
+    A table is named after its file name without the extension, unless another input has the same file name
+    (e.g. EPSG_4326/mag.csv and EPSG_4269/mag.csv); those are named after their path relative to the inputs'
+    common folder instead (EPSG_4326_mag and EPSG_4269_mag), so their grids do not overwrite each other.
+
+    Returns:
+    dict: Input path -> base name.
+    """
+    stems = [os.path.splitext(os.path.basename(file_path))[0] for file_path in files]
+    common = os.path.commonpath([os.path.abspath(os.path.dirname(file_path)) for file_path in files]) if files else ''
+    names = {}
+    for file_path, stem in zip(files, stems):
+        if stems.count(stem) > 1:
+            stem = os.path.splitext(os.path.relpath(os.path.abspath(file_path), common))[0]
+        names[file_path] = clean_name(stem)
+    if len(set(names.values())) < len(names):
+        raise ValueError("Input tables with the same name would overwrite each other's grids; rename them.")
+    return names
+
+def output_name(base_name, column, method):
+    """Build an output file name (without extension) from the table's base name, column and method."""
+    return f"{base_name}_{clean_name(column)}_{method}"
+
+def grid_file(file_path, columns, base_name, output_dir, method, cell_size, search_radius, png):
+    """
+    Grid every requested column of one table and write a GeoTIFF (and optionally a PNG preview) per column.
+
+    The survey's spatial index is built once and reused for all of its columns. Errors are printed
+    rather than raised, so one bad file does not stop a batch. The outputs are named after base_name
+    (see output_base_names), the column and the method.
+
+    Returns:
+    list: Paths of the GeoTIFFs written.
+    """
+    outputs = []
+    try:
+        survey = read_survey(file_path, columns)
+        if survey is None:
+            print(f"Skipped file with no coordinates: {file_path}")
+            return outputs
+        df, (x_column, y_column), values = survey
+        if not values:
+            print(f"Skipped file with no columns to grid: {file_path}")
+            return outputs
+
+        x = df[x_column].to_numpy(dtype='float64')
+        y = df[y_column].to_numpy(dtype='float64')
+        xi, yi = make_grid_axes(x, y, cell_size)
+        tiled = len(xi) * len(yi) > MAX_GRID_CELLS
+        gridder = None if tiled else SurveyGridder(x, y, xi, yi, search_radius)
+
+        for column in values:
+            z = df[column].to_numpy(dtype='float64')
+            output_path = os.path.join(output_dir, output_name(base_name, column, method) + '.tif')
+            if tiled:
+                # Already inside a worker, so the tiles are gridded in this process
+                grid_to_geotiff(x, y, z, xi, yi, output_path, method, search_radius, workers=1)
+            else:
+                Zi = gridder.grid(z, method)
+                save_as_geotiff(xi, yi, Zi, output_path)
+                if png:
+                    save_preview(xi, yi, Zi, f"{os.path.basename(file_path)}: {column}", column,
+                                 os.path.splitext(output_path)[0] + '.png')
+            outputs.append(output_path)
+
+    except Exception as e:
+        print(f"Error gridding {file_path}: {e}")
+    return outputs
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid value columns of survey tables to GeoTIFFs without any dialogs.")
+    parser.add_argument('inputs', nargs='+', help="CSV, Parquet or Feather tables in EPSG:4326, or glob patterns (quote them, e.g. 'surveys/**/*.csv').")
+    parser.add_argument('--columns', nargs='+', help="Value columns to grid (default: every numeric column other than the coordinates).")
+    parser.add_argument('--output-dir', default='.', help="Folder for the GeoTIFFs and previews (default: current folder).")
+    parser.add_argument('--method', choices=GRIDDING_METHODS, default='idw', help="Gridding method (default: idw).")
+    parser.add_argument('--cell-size', type=float, help="Cell size in degrees (default: a 500 x 500 grid per file).")
+    parser.add_argument('--search-radius', type=float, help="Blank cells with no point within this many degrees.")
+    parser.add_argument('--png', action='store_true', help="Also write a PNG preview of each grid.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Number of files gridded in parallel (default: number of CPUs).")
+    args = parser.parse_args()
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No input files. Exiting...")
+        return
+    try:
+        base_names = output_base_names(files)
+    except ValueError as e:
+        print(f"{e} Exiting...")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # One job per file, so each survey's index serves all its columns; with fewer files than workers
+    # (e.g. the channels of a single survey), one job per column instead
+    if args.columns and len(files) < args.workers:
+        jobs = [(file_path, [column]) for file_path in files for column in args.columns]
+    else:
+        jobs = [(file_path, args.columns) for file_path in files]
+
+    options = (args.output_dir, args.method, args.cell_size, args.search_radius, args.png)
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as executor:
+            futures = [executor.submit(grid_file, file_path, columns, base_names[file_path], *options) for file_path, columns in jobs]
+            outputs = [future.result() for future in futures]
+    else:
+        outputs = [grid_file(file_path, columns, base_names[file_path], *options) for file_path, columns in jobs]
+
+    print(f"Wrote {sum(len(file_outputs) for file_outputs in outputs)} grid(s) from {len(files)} file(s) to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import numpy as np
+import pandas as pd
+from osgeo import gdal, ogr
+from table_io import is_table_file, table_columns, coordinate_columns, iter_table_chunks
+from reprojection import crs_from_folder
+
+# Default catalog location, next to the processed data (scripts are run from their own folder, like '../data')
+CATALOG_PATH = os.path.join('..', 'data', 'processed', 'catalog.sqlite')
+
+# Raster files catalogued as layers. COGs written by the organizer end in _cog.tif.
+RASTER_EXTENSIONS = ('.tif', '.tiff', '.ers')
+
+# Extensions of the source rasters the organizer moves next to their converted tables
+SOURCE_RASTER_EXTENSIONS = ('_cog.tif', '.tif', '.tiff', '.ERS', '.ers')
+
+def open_catalog(catalog_path=CATALOG_PATH):
+    """
+    Open (or create) the spatial catalog of processed layers, a SQLite database.
+
+    Table layers, one row per file:
+    path: Absolute path of the file.
+    kind: 'table' (CSV, Parquet, Feather), 'shapefile' or 'raster'.
+    crs: e.g. "EPSG:4326", or None if unknown.
+    minx, miny, maxx, maxy: Extent, in the layer's CRS.
+    row_count: Rows, features or pixels.
+    columns: JSON list of [name, type] pairs (band types for rasters).
+    size, mtime, content_hash: Identity of the file when it was catalogued (BLAKE2b of the content).
+
+    Table layer_columns has one row per (path, column) so layers can be looked up by column name.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(catalog_path)), exist_ok=True)
+    conn = sqlite3.connect(catalog_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS layers (
+            path TEXT PRIMARY KEY,
+            kind TEXT,
+            crs TEXT,
+            minx REAL, miny REAL, maxx REAL, maxy REAL,
+            row_count INTEGER,
+            columns TEXT,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS layers_extent ON layers (minx, maxx, miny, maxy);
+        CREATE TABLE IF NOT EXISTS layer_columns (
+            path TEXT,
+            name TEXT COLLATE NOCASE,
+            type TEXT,
+            PRIMARY KEY (path, name)
+        );
+        CREATE INDEX IF NOT EXISTS layer_columns_name ON layer_columns (name);
+    """)
+    conn.commit()
+    return conn
+
+def layer_kind(file_path):
+    """Return the kind of layer a file is catalogued as, or None if it is not a layer (e.g. a sidecar)."""
+    lower = file_path.lower()
+    if is_table_file(lower):
+        return 'table'
+    if lower.endswith('.shp'):
+        return 'shapefile'
+    if lower.endswith(RASTER_EXTENSIONS):
+        return 'raster'
+    return None
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the BLAKE2b hex digest of a file's content, read in chunks."""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def raster_extent(dataset):
+    """
+    Compute the extent of a raster's pixel coordinates from its geotransform, without reading any pixels.
+
+    The coordinates are those written to the raster's point table (the top-left corner of each pixel),
+    so the extent matches the table's min/max exactly.
+    """
+    geotransform = dataset.GetGeoTransform()
+    last_col, last_row = dataset.RasterXSize - 1, dataset.RasterYSize - 1
+    corners = [(col, row) for col in (0, last_col) for row in (0, last_row)]
+    xs = [geotransform[0] + col * geotransform[1] + row * geotransform[2] for col, row in corners]
+    ys = [geotransform[3] + col * geotransform[4] + row * geotransform[5] for col, row in corners]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def spatial_ref_crs(spatial_ref):
+    """Return an OSR spatial reference as "AUTHORITY:CODE", or None if it has none."""
+    if spatial_ref is None:
+        return None
+    authority = spatial_ref.GetAuthorityName(None)
+    code = spatial_ref.GetAuthorityCode(None)
+    return f"{authority}:{code}" if authority and code else None
+
+def source_raster(table_path):
+    """Return the raster a converted table was made from, if it sits next to the table."""
+    base_name = os.path.splitext(table_path)[0]
+    for ext in SOURCE_RASTER_EXTENSIONS:
+        if os.path.exists(base_name + ext):
+            return base_name + ext
+    return None
+
+def count_csv_rows(file_path, block_size=1024 * 1024):
+    """Count the data rows of a CSV by counting line breaks (the tables written here never quote newlines)."""
+    lines = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1  # No newline after the last row
+    return max(lines - 1, 0)
+
+def table_schema(file_path):
+    """Return a table's [name, type] pairs, from the file's schema or, for CSVs, from the first rows."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        # Decoded as ISO-8859-1, which never fails, so the whole file is not checked just to read a sample
+        sample = pd.read_csv(file_path, nrows=1000, encoding='ISO-8859-1')
+        return [[str(name), str(dtype)] for name, dtype in sample.dtypes.items()]
+    import pyarrow.parquet as pq
+    import pyarrow as pa
+    if ext == '.parquet':
+        schema = pq.read_schema(file_path)
+    else:
+        with pa.memory_map(file_path) as source:
+            schema = pa.ipc.open_file(source).schema
+    return [[field.name, str(field.type)] for field in schema]
+
+def table_row_count(file_path):
+    """Return a table's row count, from the file's metadata for the columnar formats."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        return count_csv_rows(file_path)
+    import pyarrow.parquet as pq
+    import pyarrow as pa
+    if ext == '.parquet':
+        return pq.ParquetFile(file_path).metadata.num_rows
+    with pa.memory_map(file_path) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+def describe_table(file_path, chunk_rows=1_000_000):
+    """
+    Describe a CSV, Parquet or Feather table.
+
+    The extent of a table converted from a raster comes from the raster's geotransform when the raster is
+    alongside; otherwise only the coordinate columns are read, chunk by chunk, keeping a running min/max.
+    """
+    info = {'kind': 'table', 'crs': crs_from_folder(file_path), 'columns': table_schema(file_path),
+            'row_count': table_row_count(file_path), 'extent': None}
+
+    raster_path = source_raster(file_path)
+    dataset = gdal.Open(raster_path) if raster_path else None
+    if dataset is not None:
+        info['extent'] = raster_extent(dataset)
+        return info
+
+    columns = coordinate_columns(table_columns(file_path))
+    if columns is None:
+        return info
+    x_column, y_column = columns
+    bounds = np.array([np.inf, np.inf, -np.inf, -np.inf])
+    for chunk in iter_table_chunks(file_path, chunk_rows, columns=[x_column, y_column]):
+        x = chunk[x_column].to_numpy(dtype='float64')
+        y = chunk[y_column].to_numpy(dtype='float64')
+        if len(chunk):
+            bounds = np.array([min(bounds[0], np.nanmin(x)), min(bounds[1], np.nanmin(y)),
+                               max(bounds[2], np.nanmax(x)), max(bounds[3], np.nanmax(y))])
+    if np.isfinite(bounds).all():
+        info['extent'] = tuple(bounds.tolist())
+    return info
+
+def describe_shapefile(file_path):
+    """Describe a shapefile from its headers (.shp extent, .shx count, .dbf fields, .prj CRS)."""
+    dataset = ogr.Open(file_path)
+    if dataset is None:
+        raise IOError(f"Unable to open {file_path}")
+    layer = dataset.GetLayer(0)
+    definition = layer.GetLayerDefn()
+    minx, maxx, miny, maxy = layer.GetExtent()
+    return {
+        'kind': 'shapefile',
+        'crs': spatial_ref_crs(layer.GetSpatialRef()) or crs_from_folder(file_path),
+        'columns': [[definition.GetFieldDefn(i).GetName(), definition.GetFieldDefn(i).GetTypeName()]
+                    for i in range(definition.GetFieldCount())],
+        'row_count': layer.GetFeatureCount(),
+        'extent': (minx, miny, maxx, maxy),
+    }
+
+def describe_raster(file_path):
+    """Describe a raster from its header (geotransform, size, band types, projection)."""
+    dataset = gdal.Open(file_path)
+    if dataset is None:
+        raise IOError(f"Unable to open {file_path}")
+    spatial_ref = dataset.GetSpatialRef() if hasattr(dataset, 'GetSpatialRef') else None
+    return {
+        'kind': 'raster',
+        'crs': spatial_ref_crs(spatial_ref) or crs_from_folder(file_path),
+        'columns': [[f"Band {i}", gdal.GetDataTypeName(dataset.GetRasterBand(i).DataType)]
+                    for i in range(1, dataset.RasterCount + 1)],
+        'row_count': dataset.RasterXSize * dataset.RasterYSize,
+        'extent': raster_extent(dataset),
+    }
+
+def describe_layer(file_path):
+    """Describe a layer file (see describe_table, describe_shapefile and describe_raster)."""
+    kind = layer_kind(file_path)
+    if kind == 'table':
+        return describe_table(file_path)
+    if kind == 'shapefile':
+        return describe_shapefile(file_path)
+    if kind == 'raster':
+        return describe_raster(file_path)
+    raise ValueError(f"Not a layer file: {file_path}")
+
+def update_catalog(conn, files):
+    """
+    Add or refresh the catalog entries of the given layer files; other files are ignored.
+
+    Files unchanged (same size and mtime) since they were catalogued are not read again.
+    Errors are printed and the file is skipped, so one bad file does not stop the update.
+
+    Returns:
+    int: Number of entries added or refreshed.
+    """
+    updated = 0
+    for file_path in files:
+        if layer_kind(file_path) is None:
+            continue
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = conn.execute("SELECT size, mtime FROM layers WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            continue
+
+        try:
+            info = describe_layer(path)
+            content_hash = hash_file(path)
+        except Exception as e:
+            print(f"Error cataloguing {file_path}: {e}")
+            continue
+
+        minx, miny, maxx, maxy = info['extent'] or (None, None, None, None)
+        conn.execute("INSERT OR REPLACE INTO layers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (path, info['kind'], info['crs'], minx, miny, maxx, maxy, info['row_count'],
+                      json.dumps(info['columns']), stat.st_size, stat.st_mtime, content_hash, time.time()))
+        conn.execute("DELETE FROM layer_columns WHERE path = ?", (path,))
+        conn.executemany("INSERT OR IGNORE INTO layer_columns VALUES (?, ?, ?)",
+                         [(path, name, column_type) for name, column_type in info['columns']])
+        conn.commit()
+        updated += 1
+    return updated
+
+def index_folder(conn, folder):
+    """
+    Bring the catalog up to date with a folder: catalog new and changed layers and drop entries whose file is gone.
+
+    Returns:
+    int: Number of entries added or refreshed.
+    """
+    files = [os.path.join(root, file) for root, _, names in os.walk(folder) for file in names]
+    updated = update_catalog(conn, files)
+
+    for layer in find_layers(conn, folder=folder):
+        path = layer['path']
+        if not os.path.exists(path):
+            conn.execute("DELETE FROM layers WHERE path = ?", (path,))
+            conn.execute("DELETE FROM layer_columns WHERE path = ?", (path,))
+    conn.commit()
+    return updated
+
+def find_layers(conn, aoi=None, column=None, kind=None, folder=None):
+    """
+    Query the catalog.
+
+    Args:
+    conn (sqlite3.Connection): The open catalog.
+    aoi (tuple): Optional (minx, miny, maxx, maxy); only layers whose extent intersects it are returned.
+    column (str): Optional column name (case-insensitive) the layers must have.
+    kind (str or tuple): Optional layer kind(s): 'table', 'shapefile' or 'raster'.
+    folder (str): Optional folder the layers must be in (at any depth).
+
+    Returns:
+    list of dict: The matching layers, ordered by path, with their extent as a bbox dict
+                  ({'minx', 'miny', 'maxx', 'maxy'}, or None if unknown) and columns as a list.
+    """
+    clauses, params = [], []
+    if aoi is not None:
+        clauses.append("maxx >= ? AND minx <= ? AND maxy >= ? AND miny <= ?")
+        params += [aoi[0], aoi[2], aoi[1], aoi[3]]
+    if column is not None:
+        clauses.append("path IN (SELECT path FROM layer_columns WHERE name = ?)")
+        params.append(column)
+    if kind is not None:
+        kinds = (kind,) if isinstance(kind, str) else tuple(kind)
+        clauses.append(f"kind IN ({', '.join('?' for _ in kinds)})")
+        params += list(kinds)
+    if folder is not None:
+        clauses.append("substr(path, 1, ?) = ?")
+        prefix = os.path.join(os.path.abspath(folder), '')
+        params += [len(prefix), prefix]
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    cursor = conn.execute(f"SELECT * FROM layers {where} ORDER BY path", params)
+    names = [description[0] for description in cursor.description]
+
+    layers = []
+    for row in cursor.fetchall():
+        layer = dict(zip(names, row))
+        extent = [layer.pop(key) for key in ('minx', 'miny', 'maxx', 'maxy')]
+        layer['bbox'] = dict(zip(('minx', 'miny', 'maxx', 'maxy'), extent)) if None not in extent else None
+        layer['columns'] = json.loads(layer['columns'])
+        layers.append(layer)
+    return layers
@@ -1,6 +1,6 @@
-import geopandas as gpd
-import pandas as pd
+import heapq
 import os
+from catalog import open_catalog, index_folder, find_layers
 
 # Define the directories for vector and raster data
 output_dir = "../data/processed"
@@ -10,11 +10,6 @@ raster_data_dir = "../data/processed/raster_data/EPSG_4326"
 # Store bounding boxes for comparison
 bounding_boxes = []
 
-def get_bounding_box(gdf):
-    """Calculate the bounding box of a GeoDataFrame."""
-    minx, miny, maxx, maxy = gdf.total_bounds
-    return {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}
-
 def check_overlap(bbox1, bbox2):
     """Check if two bounding boxes overlap."""
     return not (bbox1['maxx'] < bbox2['minx'] or
@@ -22,75 +17,54 @@ def check_overlap(bbox1, bbox2):
                 bbox1['maxy'] < bbox2['miny'] or
                 bbox1['miny'] > bbox2['maxy'])
 
-def process_shapefile(file_path):
-    """Process shapefile and calculate bounding box."""
-    gdf = gpd.read_file(file_path)
-    bbox = get_bounding_box(gdf)
-    return bbox
+def find_overlaps(boxes):
+    """
+    Find every pair of overlapping bounding boxes with a sort-and-sweep along x.
 
-def process_csv(file_path):
-    """Process CSV file and calculate bounding box."""
-    df = pd.read_csv(file_path)
-    
-    # Standardize column names to lowercase for case-insensitive checks
-    df.columns = df.columns.str.lower()
+    Boxes are visited by increasing minx; a box stays active until the sweep passes its maxx,
+    so only boxes whose x ranges overlap are ever compared. This takes O(n log n + k) for k
+    overlapping pairs on typical layouts, instead of comparing all n² pairs.
 
-    # Check for latitude/longitude or x/y columns
-    if 'latitude' in df.columns and 'longitude' in df.columns:
-        lat_col, lon_col = 'latitude', 'longitude'
-    elif 'y' in df.columns and 'x' in df.columns:
-        lat_col, lon_col = 'y', 'x'
-    else:
-        print(f"CSV file {file_path} does not contain Latitude/Longitude or X/Y columns.")
-        return None
+    Args:
+    boxes (list of dict): Bounding boxes with minx, miny, maxx and maxy.
 
-    # Calculate the bounding box
-    min_lat = df[lat_col].min()
-    max_lat = df[lat_col].max()
-    min_lon = df[lon_col].min()
-    max_lon = df[lon_col].max()
+    Returns:
+    list of tuples: (i, j) index pairs with i < j, in the same order as a pairwise loop would give them.
+    """
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i]['minx'])
+    active = []  # Heap of (maxx, index)
+    pairs = []
+    for i in order:
+        box = boxes[i]
+        # Drop the boxes that end before this one starts (touching boxes still overlap)
+        while active and active[0][0] < box['minx']:
+            heapq.heappop(active)
+        for _, j in active:
+            if check_overlap(boxes[j], box):
+                pairs.append((min(i, j), max(i, j)))
+        heapq.heappush(active, (box['maxx'], i))
+    return sorted(pairs)
 
-    return {'minx': min_lon, 'miny': min_lat, 'maxx': max_lon, 'maxy': max_lat}
+# Bring the catalog up to date (only new and changed files are read) and take the extents from it
+catalog = open_catalog()
+index_folder(catalog, vector_data_dir)
+index_folder(catalog, raster_data_dir)
 
-# Traverse the vector data directory and process shapefiles and CSV files
-for subdir, dirs, files in os.walk(vector_data_dir):
-    for file in files:
-        file_path = os.path.join(subdir, file)
-        
-        # Check if it's a shapefile
-        if file.lower().endswith('.shp'):
-            bbox = process_shapefile(file_path)
-            if bbox:
-                bounding_boxes.append({'file': file, 'bbox': bbox})  # Add just the filename
-        
-        # Check if it's a CSV file (for vector data)
-        elif file.lower().endswith('.csv'):
-            bbox = process_csv(file_path)
-            if bbox:
-                bounding_boxes.append({'file': file, 'bbox': bbox})  # Add just the filename
+layers = find_layers(catalog, kind=('shapefile', 'table'), folder=vector_data_dir)
+layers += find_layers(catalog, kind='table', folder=raster_data_dir)
+# Rasters kept as Cloud-Optimized GeoTIFFs have no table
+layers += [layer for layer in find_layers(catalog, kind='raster', folder=raster_data_dir) if layer['path'].endswith('_cog.tif')]
 
-# Traverse the raster data directory and process CSV files (assuming these represent raster data)
-for subdir, dirs, files in os.walk(raster_data_dir):
-    for file in files:
-        file_path = os.path.join(subdir, file)
-        
-        # Check if it's a CSV file (for raster data)
-        if file.lower().endswith('.csv'):
-            bbox = process_csv(file_path)
-            if bbox:
-                bounding_boxes.append({'file': file, 'bbox': bbox})  # Add just the filename
+for layer in layers:
+    if layer['bbox']:
+        bounding_boxes.append({'file': os.path.basename(layer['path']), 'bbox': layer['bbox']})  # Add just the filename
+    else:
+        print(f"File {layer['path']} does not contain Latitude/Longitude or X/Y columns.")
 
 # Compare bounding boxes to find overlaps
 overlap_results = []
-for i in range(len(bounding_boxes)):
-    for j in range(i+1, len(bounding_boxes)):
-        file1 = bounding_boxes[i]['file']
-        file2 = bounding_boxes[j]['file']
-        bbox1 = bounding_boxes[i]['bbox']
-        bbox2 = bounding_boxes[j]['bbox']
-        
-        if check_overlap(bbox1, bbox2):
-            overlap_results.append((file1, file2)) # Avoids redundant entries
+for i, j in find_overlaps([entry['bbox'] for entry in bounding_boxes]):
+    overlap_results.append((bounding_boxes[i]['file'], bounding_boxes[j]['file'])) # Avoids redundant entries
 
 # Write the results to a text file
 output_file = os.path.join(output_dir, "overlap_summary.txt")
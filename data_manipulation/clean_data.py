@@ -1,7 +1,11 @@
+import os
+import sys
+import argparse
 import pandas as pd
 import tkinter as tk
 from tkinter import simpledialog, messagebox, filedialog
 from utils import select_file, load_file, select_column
+from cleaning_rules import CLEANING_ERRORS, parse_rules, clean_table
 
 def get_cleaning_range(column_name):
     """Prompt the user for the inclusive range of values to keep in the selected column."""
@@ -75,32 +79,91 @@ def save_cleaned_file(df, file_path):
     else:
         print("Save operation cancelled.")
 
-# Main execution
-file_path = select_file()
+def clean_interactively():
+    """Pick a file, a column and a range through dialogs, and save the cleaned file."""
+    file_path = select_file()
 
-if file_path:
-    # Load the file into a DataFrame/GeoDataFrame
-    df = load_file(file_path)
-    
-    if df is not None:
-        # Ask if the user wants to clean the data or skip to statistics
-        root = tk.Tk()
-        root.withdraw()
-        user_choice = messagebox.askyesno("Data Cleaning", "Would you like to clean the data before proceeding to statistics?")
-        
-        if user_choice:
-            # Prompt the user to select a column
-            column_to_clean = select_column(df, "Which column would you like to clean?")
-            
-            # Prompt the user to input a range of values to keep
-            lower_bound, upper_bound = get_cleaning_range(column_to_clean)
-            
-            if lower_bound is not None and upper_bound is not None:
-                # Clean the data by the specified range
-                df_cleaned = clean_data_by_range(df, column_to_clean, lower_bound, upper_bound)
-                
-                # Save the cleaned file
-                save_cleaned_file(df_cleaned, file_path)
-                df = df_cleaned  # Update df with the cleaned version
-else:
-    print("No file selected. Exiting...")
+    if file_path:
+        # Load the file into a DataFrame/GeoDataFrame
+        df = load_file(file_path)
+
+        if df is not None:
+            # Ask if the user wants to clean the data or skip to statistics
+            root = tk.Tk()
+            root.withdraw()
+            user_choice = messagebox.askyesno("Data Cleaning", "Would you like to clean the data before proceeding to statistics?")
+
+            if user_choice:
+                # Prompt the user to select a column
+                column_to_clean = select_column(df, "Which column would you like to clean?")
+
+                # Prompt the user to input a range of values to keep
+                lower_bound, upper_bound = get_cleaning_range(column_to_clean)
+
+                if lower_bound is not None and upper_bound is not None:
+                    # Clean the data by the specified range
+                    df_cleaned = clean_data_by_range(df, column_to_clean, lower_bound, upper_bound)
+
+                    # Save the cleaned file
+                    save_cleaned_file(df_cleaned, file_path)
+                    df = df_cleaned  # Update df with the cleaned version
+    else:
+        print("No file selected. Exiting...")
+
+def clean_files(input_paths, rules_text, output_dir=None, output_path=None, chunk_rows=500_000):
+    """
+    Clean tables by a rule set without any dialogs, streaming each one chunk by chunk.
+
+    Args:
+    input_paths (list): CSV, Parquet or Feather tables.
+    rules_text (str): Rule set, e.g. "Quality flag == 0 AND 0 <= Apparent Uranium <= 50 AND altimeter < 300".
+    output_dir (str): Folder for the cleaned tables (default: next to each input), named <name>_cleaned<ext>.
+    output_path (str): Output path, for a single input only; its extension sets the format.
+    chunk_rows (int): Rows per chunk.
+
+    Returns:
+    list: Paths of the cleaned tables.
+    """
+    rules = parse_rules(rules_text)
+    outputs = []
+    for input_path in input_paths:
+        if output_path is None:
+            base_name, ext = os.path.splitext(os.path.basename(input_path))
+            folder = output_dir or os.path.dirname(input_path)
+            cleaned_path = os.path.join(folder, f"{base_name}_cleaned{ext}")
+        else:
+            cleaned_path = output_path
+        try:
+            rows_in, rows_kept = clean_table(input_path, cleaned_path, rules, chunk_rows)
+        except CLEANING_ERRORS as e:
+            print(f"Error cleaning {input_path}: {e}")
+            continue
+        print(f"{input_path}: rows removed: {rows_in - rows_kept}, rows kept: {rows_kept}. Saved as: {cleaned_path}")
+        outputs.append(cleaned_path)
+    return outputs
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        # No arguments: the original dialog-driven workflow
+        clean_interactively()
+        return
+
+    parser = argparse.ArgumentParser(description="Clean tables by a rule set, without dialogs. Run without arguments for the interactive mode.")
+    parser.add_argument('inputs', nargs='+', help="CSV, Parquet or Feather tables to clean.")
+    parser.add_argument('--rules', required=True,
+                        help='Conditions joined by AND, e.g. "Quality flag == 0 AND 0 <= Apparent Uranium <= 50 AND altimeter < 300".')
+    parser.add_argument('--output-dir', help="Folder for the cleaned tables (default: next to each input, as <name>_cleaned).")
+    parser.add_argument('--output', help="Output path for a single input; its extension sets the format.")
+    parser.add_argument('--chunk-rows', type=int, default=500_000, help="Rows read at a time (default: 500000).")
+    args = parser.parse_args(argv)
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output can only be used with a single input.")
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    clean_files(args.inputs, args.rules, args.output_dir, args.output, args.chunk_rows)
+
+
+if __name__ == '__main__':
+    main()
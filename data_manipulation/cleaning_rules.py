@@ -0,0 +1,211 @@
+import os
+import re
+import pandas as pd
+from table_io import table_columns, iter_table_chunks, open_table_writer
+
+# Errors that mean one table could not be cleaned (a batch reports them and moves on to the next table)
+try:
+    from pyarrow import ArrowException
+    CLEANING_ERRORS = (ValueError, KeyError, TypeError, ArrowException)
+except ImportError:
+    CLEANING_ERRORS = (ValueError, KeyError, TypeError)
+
+# Comparison operators a rule can use (the same ones pyarrow accepts in filters)
+OPERATORS = {
+    '==': lambda series, value: series == value,
+    '!=': lambda series, value: series != value,
+    '<': lambda series, value: series < value,
+    '<=': lambda series, value: series <= value,
+    '>': lambda series, value: series > value,
+    '>=': lambda series, value: series >= value,
+}
+
+_OPERATOR = r'(==|!=|<=|>=|<|>)'
+_VALUE = r'("[^"]*"|\'[^\']*\'|[^\s<>=!]+)'
+_RANGE = re.compile(rf'^{_VALUE}\s*(<=|<)\s*(.+?)\s*(<=|<)\s*{_VALUE}$')
+_COMPARISON = re.compile(rf'^(.+?)\s*{_OPERATOR}\s*{_VALUE}$')
+# A quoted column name may hold operators or spaces, so it is matched before the rest of the condition is split
+_QUOTED_COLUMN = re.compile(r'^(`[^`]*`|"[^"]*"|\'[^\']*\')\s*(.*)$')
+_RANGE_LOW = re.compile(rf'^{_VALUE}\s*(<=|<)\s*(.*)$')
+_OPERATOR_VALUE = re.compile(rf'^{_OPERATOR}\s*{_VALUE}$')
+_RANGE_HIGH = re.compile(rf'^(<=|<)\s*{_VALUE}$')
+
+def _parse_value(text):
+    """Turn a rule value into a number, or a string if it is quoted or not numeric."""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        return text[1:-1]
+    for number_type in (int, float):
+        try:
+            return number_type(text)
+        except ValueError:
+            pass
+    return text
+
+def _parse_column(text):
+    """Strip optional quotes or backticks around a column name."""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'`':
+        return text[1:-1]
+    return text
+
+def _parse_condition(condition):
+    """
+    Parse one condition into a list of (column, operator, value) tuples, or return None if it is not a rule.
+
+    Quoted column names are matched first, so the operators inside them are not taken for the rule's own.
+    """
+    quoted = _QUOTED_COLUMN.match(condition)
+    if quoted:
+        match = _OPERATOR_VALUE.match(quoted.group(2))
+        if match:
+            operator, value = match.groups()
+            return [(_parse_column(quoted.group(1)), operator, _parse_value(value))]
+
+    low = _RANGE_LOW.match(condition)
+    quoted = low and _QUOTED_COLUMN.match(low.group(3))
+    if quoted:
+        match = _RANGE_HIGH.match(quoted.group(2))
+        if match:
+            column = _parse_column(quoted.group(1))
+            return [(column, '>=' if low.group(2) == '<=' else '>', _parse_value(low.group(1))),
+                    (column, match.group(1), _parse_value(match.group(2)))]
+
+    match = _RANGE.match(condition)
+    if match:
+        low, low_op, column, high_op, high = match.groups()
+        column = _parse_column(column)
+        return [(column, '>=' if low_op == '<=' else '>', _parse_value(low)), (column, high_op, _parse_value(high))]
+    match = _COMPARISON.match(condition)
+    if match:
+        column, operator, value = match.groups()
+        return [(_parse_column(column), operator, _parse_value(value))]
+    return None
+
+def parse_rules(text):
+    """
+    Parse a rule set into a list of (column, operator, value) conditions, all of which must hold.
+
+    Conditions are separated by AND (in any case). Each one is either a comparison, e.g. "altimeter < 300"
+    or "Quality flag == 0", or a range, e.g. "0 <= Apparent Uranium <= 50", which becomes two conditions.
+    Column names may contain spaces, or be quoted (with quotes or backticks) if they contain operators.
+
+    Returns:
+    list of tuple: The conditions, in pyarrow's filter format.
+
+    Examples:
+    >>> parse_rules('0 <= Apparent Uranium <= 50 AND "Quality flag" == 0')
+    [('Apparent Uranium', '>=', 0), ('Apparent Uranium', '<=', 50), ('Quality flag', '==', 0)]
+    >>> parse_rules('`a<b` < 3')
+    [('a<b', '<', 3)]
+    >>> parse_rules('0 < `x<=y` <= 5.5')
+    [('x<=y', '>', 0), ('x<=y', '<=', 5.5)]
+    """
+    rules = []
+    for condition in re.split(r'\s+AND\s+', text.strip(), flags=re.IGNORECASE):
+        conditions = _parse_condition(condition.strip())
+        if conditions is None:
+            raise ValueError(f"Cannot parse the rule: {condition.strip()!r}")
+        rules.extend(conditions)
+    return rules
+
+def rule_mask(df, rules):
+    """
+    Return a boolean Series, True for the rows of df that meet every rule.
+
+    Missing values never meet a rule. Columns compared against numbers are converted to numbers first,
+    so stray text in a numeric CSV column does not make the comparison fail.
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in rules:
+        series = df[column]
+        if not isinstance(value, str) and not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        mask &= OPERATORS[operator](series, value).fillna(False).astype(bool)
+    return mask
+
+def check_rule_columns(file_path, rules):
+    """Raise a ValueError if a rule names a column the table does not have."""
+    columns = set(table_columns(file_path))
+    missing = sorted({column for column, _, _ in rules if column not in columns})
+    if missing:
+        raise ValueError(f"{file_path} has no column(s) {', '.join(missing)}")
+
+def split_pushdown_rules(schema, rules):
+    """
+    Split rules into those Arrow can evaluate on a dataset scan and those applied after decoding.
+
+    Arrow compares numbers only with numeric columns and text only with text columns, without converting.
+    Any other rule (e.g. a number against a text column) goes through rule_mask, as for CSVs.
+
+    Returns:
+    tuple of list: The pushed-down rules and the remaining rules.
+    """
+    import pyarrow as pa
+    pushed, remaining = [], []
+    for rule in rules:
+        column_type = schema.field(rule[0]).type
+        if isinstance(rule[2], str):
+            pushable = pa.types.is_string(column_type) or pa.types.is_large_string(column_type)
+        else:
+            pushable = pa.types.is_integer(column_type) or pa.types.is_floating(column_type)
+        (pushed if pushable else remaining).append(rule)
+    return pushed, remaining
+
+def clean_table(input_path, output_path, rules, chunk_rows=500_000):
+    """
+    Keep the rows of a table that meet every rule, streaming it chunk by chunk.
+
+    Parquet and Feather inputs are filtered by a pyarrow dataset scan, so Parquet row groups whose
+    statistics rule them out are skipped before they are decoded. CSVs are filtered chunk by chunk.
+    The output format follows the output file's extension.
+
+    Args:
+    input_path (str): CSV, Parquet or Feather table.
+    output_path (str): Path of the cleaned table.
+    rules (list): Conditions from parse_rules.
+    chunk_rows (int): Rows per chunk (or record batch).
+
+    Returns:
+    tuple: Number of rows read and number of rows kept.
+    """
+    check_rule_columns(input_path, rules)
+    rows_in = rows_kept = 0
+    ext = os.path.splitext(input_path)[1].lower()
+
+    with open_table_writer(output_path) as write:
+        # An empty slice of the first decoded chunk, so an output with no kept rows keeps the input's types
+        empty = None
+        if ext in ('.parquet', '.feather'):
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+            dataset = ds.dataset(input_path, format='parquet' if ext == '.parquet' else 'ipc')
+            rows_in = dataset.count_rows()
+            pushed, remaining = split_pushdown_rules(dataset.schema, rules)
+            expression = pq.filters_to_expression([pushed]) if pushed else None
+            for batch in dataset.to_batches(filter=expression, batch_size=chunk_rows):
+                chunk = batch.to_pandas()
+                if empty is None:
+                    empty = chunk.iloc[:0]
+                if remaining:
+                    chunk = chunk[rule_mask(chunk, remaining)]
+                if len(chunk):
+                    write(chunk)
+                    rows_kept += len(chunk)
+            if empty is None:
+                empty = dataset.schema.empty_table().to_pandas()
+        else:
+            for chunk in iter_table_chunks(input_path, chunk_rows):
+                rows_in += len(chunk)
+                if empty is None:
+                    empty = chunk.iloc[:0]
+                chunk = chunk[rule_mask(chunk, rules)]
+                if len(chunk):
+                    write(chunk)
+                    rows_kept += len(chunk)
+            if empty is None:
+                empty = pd.DataFrame(columns=table_columns(input_path))
+
+        # An output with no kept rows still gets the input's columns and types
+        if rows_kept == 0:
+            write(empty)
+    return rows_in, rows_kept
@@ -1,8 +1,11 @@
+import sys
+import argparse
 import pandas as pd
 import tkinter as tk
 from tkinter import  messagebox
 import matplotlib.pyplot as plt
 from utils import select_file, load_file, select_column, select_multiple_columns
+from streaming_stats import is_profiled_type, profile_tables, merge_profiles
 
 def plot_histogram(df, column):
     """Plot a histogram of the selected column."""
@@ -39,56 +42,110 @@ def prompt_for_stats():
 
 
 
-def generate_key_statistics(df, columns):
-    """Generate key statistics (min, max, mean, median, mode, std, var) for selected columns."""
+def print_key_statistics(summaries, columns):
+    """Print the statistics of profiled columns, given as {column: summary dict}."""
     for column in columns:
         print(f"\nStatistics for column: {column}")
-
-        if pd.api.types.is_numeric_dtype(df[column]):
-            print(f"Min: {df[column].min()}")
-            print(f"Max: {df[column].max()}")
-            print(f"Mean: {df[column].mean()}")
-            print(f"Median: {df[column].median()}")
-            print(f"Mode: {df[column].mode()[0] if not df[column].mode().empty else 'N/A'}")
-            print(f"Standard Deviation: {df[column].std()}")
-            print(f"Variance: {df[column].var()}")
-            print(f"Skewness: {df[column].skew()}")
-            print(f"Kurtosis: {df[column].kurt()}")
-        elif pd.api.types.is_object_dtype(df[column]):
-            print(f"Mode: {df[column].mode()[0] if not df[column].mode().empty else 'N/A'}")
-        else:
+        if column not in summaries:
             print(f"Column {column} is not numeric or categorical. Skipping...")
+            continue
+        for name, value in summaries[column].items():
+            print(f"{name}: {value}")
 
-# Main execution
-file_path = select_file()
+def exact_summary(series):
+    """
+    Return the statistics of an in-memory column, computed exactly by pandas.
 
-if file_path:
-    # Load the file into a DataFrame/GeoDataFrame
-    df = load_file(file_path)
-    
-    if df is not None:
-        # Display the first 5 rows of data
-        print(df.head().to_markdown(index=False, numalign="left", stralign="left"))
-
-        # Print the column names and their data types
-        print(df.info())
-        
-        # Ask the user if they want to visualize data
-        if prompt_for_visualization():
-            try:
-                # Prompt the user to select the column to visualize
-                column_to_visualize = select_column(df, "Which column would you like to visualize as frequency histogram?")
-                # Plot a histogram of values for the selected column
-                plot_histogram(df, column_to_visualize)
-            except ValueError as e:
-                print(e)
-
-        # Ask the user if they want to generate key statistics
-        if prompt_for_stats():
-            # Let the user select columns for which to generate statistics
-            columns_to_analyze = select_multiple_columns(df, "Enter columns (separated by commas) for which you want key statistics")
-
-            # Generate and display key statistics for the selected columns
-            generate_key_statistics(df, columns_to_analyze)
-else:
-    print("No file selected. Exiting...")
+    Same entries as ColumnProfile.summary, which the streamed path uses; with the whole column in memory
+    there is no need for its sketches, so the median, quantiles, mode and distinct count are exact.
+    """
+    mode = series.mode()
+    summary = {'Rows': len(series), 'Missing': int(series.isna().sum()), 'Distinct': series.nunique()}
+    numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    if numeric:
+        summary.update({
+            'Min': series.min(),
+            'Max': series.max(),
+            'Mean': series.mean(),
+            'Median': series.median(),
+            'P05': series.quantile(0.05),
+            'P95': series.quantile(0.95),
+        })
+    summary['Mode'] = mode.iloc[0] if not mode.empty else 'N/A'
+    if numeric:
+        summary.update({
+            'Standard Deviation': series.std(),
+            'Variance': series.var(),
+            'Skewness': series.skew(),
+            'Kurtosis': series.kurt(),
+        })
+    return summary
+
+def generate_key_statistics(df, columns):
+    """Generate key statistics (min, max, mean, median, mode, std, var, skew, kurtosis) for selected columns of an in-memory frame."""
+    summaries = {column: exact_summary(df[column]) for column in columns if is_profiled_type(df[column])}
+    print_key_statistics(summaries, columns)
+
+def overview_interactively():
+    """Pick a file through a dialog, preview it, and optionally plot a histogram and print key statistics."""
+    file_path = select_file()
+
+    if file_path:
+        # Load the file into a DataFrame/GeoDataFrame
+        df = load_file(file_path)
+
+        if df is not None:
+            # Display the first 5 rows of data
+            print(df.head().to_markdown(index=False, numalign="left", stralign="left"))
+
+            # Print the column names and their data types
+            print(df.info())
+
+            # Ask the user if they want to visualize data
+            if prompt_for_visualization():
+                try:
+                    # Prompt the user to select the column to visualize
+                    column_to_visualize = select_column(df, "Which column would you like to visualize as frequency histogram?")
+                    # Plot a histogram of values for the selected column
+                    plot_histogram(df, column_to_visualize)
+                except ValueError as e:
+                    print(e)
+
+            # Ask the user if they want to generate key statistics
+            if prompt_for_stats():
+                # Let the user select columns for which to generate statistics
+                columns_to_analyze = select_multiple_columns(df, "Enter columns (separated by commas) for which you want key statistics")
+
+                # Generate and display key statistics for the selected columns
+                generate_key_statistics(df, columns_to_analyze)
+    else:
+        print("No file selected. Exiting...")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        # No arguments: the original dialog-driven workflow
+        overview_interactively()
+        return
+
+    parser = argparse.ArgumentParser(description="Print key statistics of tables, streaming them in one pass. Run without arguments for the interactive mode.")
+    parser.add_argument('inputs', nargs='+', help="CSV, Parquet or Feather tables.")
+    parser.add_argument('--columns', nargs='+', help="Columns to profile (default: all numeric and text columns).")
+    parser.add_argument('--chunk-rows', type=int, default=500_000, help="Rows read at a time (default: 500000).")
+    parser.add_argument('--workers', type=int, help="Number of files profiled in parallel (default: number of CPUs).")
+    parser.add_argument('--combined', action='store_true', help="Also print the statistics of all the inputs together.")
+    args = parser.parse_args(argv)
+
+    results = profile_tables(args.inputs, args.columns, args.chunk_rows, args.workers)
+    for file_path, profiles in results.items():
+        print(f"\n=== {file_path} ===")
+        print_key_statistics({column: profile.summary() for column, profile in profiles.items()}, args.columns or list(profiles))
+
+    if args.combined and len(results) > 1:
+        combined = merge_profiles(results.values())
+        print("\n=== All inputs ===")
+        print_key_statistics({column: profile.summary() for column, profile in combined.items()}, args.columns or list(combined))
+
+
+if __name__ == '__main__':
+    main()
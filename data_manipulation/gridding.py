@@ -0,0 +1,340 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from scipy.spatial import Delaunay, cKDTree
+from scipy.interpolate import CloughTocher2DInterpolator
+
+# Gridding methods understood by SurveyGridder.grid
+GRIDDING_METHODS = ('idw', 'binned_mean', 'min_curvature', 'cubic')
+
+# Tiled gridding: output tile size and GeoTIFF block size, in cells, and the halo used when there is no search radius
+TILE_SIZE = 1024
+BLOCK_SIZE = 256
+DEFAULT_HALO_CELLS = 16
+
+def make_grid_axes(x, y, cell_size=None, shape=(500, 500)):
+    """
+    Build the cell-centre coordinates of a grid covering the points.
+
+    Args:
+    x, y (numpy.ndarray): Point coordinates.
+    cell_size (float): Cell size in the coordinates' units (degrees for EPSG:4326). If None, the grid has
+                       the given shape and spans exactly from the min to the max of the points.
+    shape (tuple): (rows, cols) used when no cell size is given.
+
+    Returns:
+    tuple of numpy.ndarray: xi and yi, the cell-centre coordinates along each axis, increasing.
+    """
+    if cell_size is None:
+        return np.linspace(x.min(), x.max(), shape[1]), np.linspace(y.min(), y.max(), shape[0])
+    n_cols = int(np.floor((x.max() - x.min()) / cell_size)) + 1
+    n_rows = int(np.floor((y.max() - y.min()) / cell_size)) + 1
+    return x.min() + np.arange(n_cols) * cell_size, y.min() + np.arange(n_rows) * cell_size
+
+class SurveyGridder:
+    """
+    Grid one or more value columns of the same survey onto a regular grid.
+
+    Everything that only depends on the point locations is built once and reused for every column:
+    the KD-tree and its neighbour lists (IDW, search-radius mask), the point-to-cell assignment
+    (binned mean, minimum curvature), the minimum-curvature factorization and the Delaunay
+    triangulation (cubic).
+
+    Args:
+    x, y (numpy.ndarray): Point coordinates.
+    xi, yi (numpy.ndarray): Cell-centre coordinates along each axis (see make_grid_axes).
+    search_radius (float): Optional radius, in the coordinates' units; cells with no point within it are set to NaN.
+    """
+
+    def __init__(self, x, y, xi, yi, search_radius=None):
+        self.x = np.asarray(x, dtype='float64')
+        self.y = np.asarray(y, dtype='float64')
+        self.xi = np.asarray(xi, dtype='float64')
+        self.yi = np.asarray(yi, dtype='float64')
+        self.shape = (len(self.yi), len(self.xi))
+        self.search_radius = search_radius
+
+        self._tree = None
+        self._neighbours = {}
+        self._cells = None
+        self._mask = None
+        self._curvature_solvers = {}
+        self._triangulation = None
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(np.column_stack([self.x, self.y]))
+        return self._tree
+
+    def grid_points(self):
+        """Return the cell centres as an (n_cells, 2) array, row by row."""
+        Xi, Yi = np.meshgrid(self.xi, self.yi)
+        return np.column_stack([Xi.ravel(), Yi.ravel()])
+
+    def radius_mask(self):
+        """Return a boolean grid, True where no point lies within the search radius (None without a radius)."""
+        if self.search_radius is None:
+            return None
+        if self._mask is None:
+            distances, _ = self.tree.query(self.grid_points(), k=1, distance_upper_bound=self.search_radius)
+            self._mask = np.isinf(distances).reshape(self.shape)
+        return self._mask
+
+    def cells(self):
+        """Return the flat index of the cell each point falls in (nearest cell centre)."""
+        if self._cells is None:
+            dx = self.xi[1] - self.xi[0] if len(self.xi) > 1 else 1.0
+            dy = self.yi[1] - self.yi[0] if len(self.yi) > 1 else 1.0
+            cols = np.clip(np.rint((self.x - self.xi[0]) / dx), 0, self.shape[1] - 1).astype(np.int64)
+            rows = np.clip(np.rint((self.y - self.yi[0]) / dy), 0, self.shape[0] - 1).astype(np.int64)
+            self._cells = rows * self.shape[1] + cols
+        return self._cells
+
+    def idw(self, z, power=2, neighbours=12):
+        """Inverse-distance weighting over the nearest neighbours of each cell (within the search radius, if any)."""
+        k = min(neighbours, len(self.x))
+        if k not in self._neighbours:
+            upper_bound = self.search_radius if self.search_radius is not None else np.inf
+            distances, indices = self.tree.query(self.grid_points(), k=k, distance_upper_bound=upper_bound)
+            self._neighbours[k] = (distances.reshape(-1, k), indices.reshape(-1, k))
+        distances, indices = self._neighbours[k]
+
+        # Missing neighbours (beyond the radius) come back as index n; points with no value get no weight
+        values = np.append(np.asarray(z, dtype='float64'), np.nan)[indices]
+        valid = np.isfinite(values) & np.isfinite(distances)
+        with np.errstate(divide='ignore'):
+            weights = np.where(valid, 1.0 / distances ** power, 0.0)
+
+        # A cell centre that coincides with a point takes its value
+        exact = valid & (distances == 0)
+        weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+
+        total = weights.sum(axis=1)
+        with np.errstate(invalid='ignore'):
+            grid = (weights * np.where(valid, values, 0.0)).sum(axis=1) / total
+        return grid.reshape(self.shape)
+
+    def binned_mean(self, z):
+        """Average the values of the points falling in each cell; empty cells are NaN."""
+        z = np.asarray(z, dtype='float64')
+        valid = np.isfinite(z)
+        cells = self.cells()[valid]
+        n_cells = self.shape[0] * self.shape[1]
+        sums = np.bincount(cells, weights=z[valid], minlength=n_cells)
+        counts = np.bincount(cells, minlength=n_cells)
+        with np.errstate(invalid='ignore'):
+            return (sums / counts).reshape(self.shape)
+
+    def _curvature_solver(self, known):
+        """Factorize the minimum-curvature system for a set of known cells (cached, as it only depends on the cells)."""
+        key = known.tobytes()
+        if key not in self._curvature_solvers:
+            n_rows, n_cols = self.shape
+
+            # 5-point Laplacian with zero-gradient boundaries
+            def second_difference(n):
+                d = sparse.diags([np.ones(n - 1), -2 * np.ones(n), np.ones(n - 1)], [-1, 0, 1], format='lil')
+                if n > 1:
+                    d[0, 0] = d[n - 1, n - 1] = -1
+                return d.tocsr()
+            laplacian = (sparse.kron(sparse.identity(n_rows), second_difference(n_cols))
+                         + sparse.kron(second_difference(n_rows), sparse.identity(n_cols))).tocsr()
+            system = (laplacian.T @ laplacian).tocsc()
+
+            unknown = ~known
+            solver = splu(system[unknown][:, unknown].tocsc())
+            coupling = system[unknown][:, known]
+            self._curvature_solvers = {key: (solver, coupling)}  # Keep only the latest factorization
+        return self._curvature_solvers[key]
+
+    def min_curvature(self, z):
+        """
+        Minimum-curvature surface: the smoothest surface (least squared Laplacian) through the binned cell means.
+
+        The sparse system is factorized once and reused for every column with values in the same cells.
+        """
+        binned = self.binned_mean(z).ravel()
+        known = np.isfinite(binned)
+        if known.all() or not known.any():
+            return binned.reshape(self.shape)
+
+        solver, coupling = self._curvature_solver(known)
+        grid = binned.copy()
+        grid[~known] = solver.solve(-(coupling @ binned[known]))
+        return grid.reshape(self.shape)
+
+    def cubic(self, z):
+        """Piecewise cubic (Clough-Tocher) interpolation, as scipy's griddata(method='cubic'), on a reused triangulation."""
+        z = np.asarray(z, dtype='float64')
+        valid = np.isfinite(z)
+        if valid.all():
+            if self._triangulation is None:
+                self._triangulation = Delaunay(np.column_stack([self.x, self.y]))
+            interpolator = CloughTocher2DInterpolator(self._triangulation, z)
+        else:
+            # Points without a value need their own triangulation
+            interpolator = CloughTocher2DInterpolator(np.column_stack([self.x[valid], self.y[valid]]), z[valid])
+        Xi, Yi = np.meshgrid(self.xi, self.yi)
+        return interpolator(Xi, Yi)
+
+    def grid(self, z, method='idw', **kwargs):
+        """
+        Grid one value column with one of GRIDDING_METHODS, then apply the search-radius mask if there is one.
+
+        Returns:
+        numpy.ndarray: A (len(yi), len(xi)) grid; row 0 is at yi[0].
+        """
+        if method not in GRIDDING_METHODS:
+            raise ValueError(f"Unknown gridding method: {method}")
+        grid = getattr(self, method)(z, **kwargs)
+        mask = self.radius_mask()
+        if mask is not None:
+            grid = np.where(mask, np.nan, grid)
+        return grid
+
+def tile_windows(shape, tile_size=TILE_SIZE):
+    """Yield (row_off, col_off, rows, cols) windows covering a grid of the given (rows, cols) shape."""
+    for row_off in range(0, shape[0], tile_size):
+        for col_off in range(0, shape[1], tile_size):
+            yield row_off, col_off, min(tile_size, shape[0] - row_off), min(tile_size, shape[1] - col_off)
+
+def grid_tile(x, y, z, xi, yi, window, halo_cells, method, search_radius, kwargs):
+    """
+    Grid one tile: the tile is gridded together with a halo of cells around it, so that interpolation
+    near its edges sees the neighbouring points, and only the interior is returned.
+
+    Args:
+    x, y, z (numpy.ndarray): The points selected for the tile and its halo.
+    xi, yi (numpy.ndarray): Cell-centre coordinates of the whole grid.
+    window (tuple): (row_off, col_off, rows, cols) of the tile.
+    halo_cells (int): Halo width in cells.
+    method (str): One of GRIDDING_METHODS.
+    search_radius (float): Optional search radius.
+    kwargs (dict): Extra arguments for the gridding method.
+
+    Returns:
+    tuple: The window and the tile's grid as float32.
+    """
+    row_off, col_off, rows, cols = window
+    r0, c0 = max(row_off - halo_cells, 0), max(col_off - halo_cells, 0)
+    r1, c1 = min(row_off + rows + halo_cells, len(yi)), min(col_off + cols + halo_cells, len(xi))
+
+    # Cubic interpolation needs a triangle; any method needs a point
+    if len(x) == 0 or (method == 'cubic' and len(x) < 3):
+        return window, np.full((rows, cols), np.nan, dtype='float32')
+
+    grid = SurveyGridder(x, y, xi[c0:c1], yi[r0:r1], search_radius).grid(z, method, **kwargs)
+    return window, grid[row_off - r0:row_off - r0 + rows, col_off - c0:col_off - c0 + cols].astype('float32')
+
+def grid_to_geotiff(x, y, z, xi, yi, output_path, method='idw', search_radius=None,
+                    tile_size=TILE_SIZE, halo_cells=None, workers=None, **kwargs):
+    """
+    Grid a survey tile by tile and write the tiles straight into a tiled GeoTIFF.
+
+    Only one tile's points and grid are held per worker, so the full grid never has to fit in memory.
+    Each tile's points (including its halo) are selected through a KD-tree of the survey.
+
+    Args:
+    x, y, z (numpy.ndarray): Point coordinates and values.
+    xi, yi (numpy.ndarray): Cell-centre coordinates along each axis (see make_grid_axes).
+    output_path (str): Path of the GeoTIFF.
+    method (str): One of GRIDDING_METHODS.
+    search_radius (float): Optional search radius, in the coordinates' units.
+    tile_size (int): Tile size in cells (a multiple of BLOCK_SIZE).
+    halo_cells (int): Halo width in cells; defaults to the search radius, or DEFAULT_HALO_CELLS without one.
+    workers (int): Number of worker processes (default: CPU count); 1 grids the tiles in this process.
+    **kwargs: Extra arguments for the gridding method (e.g. power or neighbours for IDW).
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    z = np.asarray(z, dtype='float64')
+    dx = xi[1] - xi[0] if len(xi) > 1 else 0.0
+    dy = yi[1] - yi[0] if len(yi) > 1 else 0.0
+    if halo_cells is None:
+        # The halo must span the search radius along the axis with the finer spacing
+        spacings = [spacing for spacing in (dx, dy) if spacing > 0]
+        halo_cells = math.ceil(search_radius / min(spacings)) if search_radius and spacings else DEFAULT_HALO_CELLS
+    tree = cKDTree(np.column_stack([x, y]))
+
+    def jobs():
+        for window in tile_windows((len(yi), len(xi)), tile_size):
+            row_off, col_off, rows, cols = window
+            # Extent of the tile and its halo, to the outer edges of its cells
+            x0 = xi[max(col_off - halo_cells, 0)] - dx / 2
+            x1 = xi[min(col_off + cols + halo_cells, len(xi)) - 1] + dx / 2
+            y0 = yi[max(row_off - halo_cells, 0)] - dy / 2
+            y1 = yi[min(row_off + rows + halo_cells, len(yi)) - 1] + dy / 2
+            selected = np.asarray(tree.query_ball_point([(x0 + x1) / 2, (y0 + y1) / 2],
+                                                        max(x1 - x0, y1 - y0) / 2, p=np.inf), dtype=np.int64)
+            selected = selected[(x[selected] >= x0) & (x[selected] <= x1) & (y[selected] >= y0) & (y[selected] <= y1)]
+            yield x[selected], y[selected], z[selected], xi, yi, window, halo_cells, method, search_radius, kwargs
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        save_as_geotiff(xi, yi, (grid_tile(*job) for job in jobs()), output_path, shape=(len(yi), len(xi)))
+        return
+
+    def gridded_tiles(executor):
+        # Keep a couple of tiles per worker in flight, so the selected points are not all queued at once
+        pending = set()
+        for job in jobs():
+            pending.add(executor.submit(grid_tile, *job))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        save_as_geotiff(xi, yi, gridded_tiles(executor), output_path, shape=(len(yi), len(xi)))
+
+def axis_spacing(axis, fallback=1.0):
+    """Return the spacing of evenly spaced cell-centre coordinates (fallback for a single cell)."""
+    return float(axis[1] - axis[0]) if len(axis) > 1 else fallback
+
+def save_as_geotiff(xi, yi, Zi, output_path, shape=None):
+    """
+    Save the heatmap as a GeoTIFF file.
+
+    The georeference comes from the grid's cell-centre coordinates: pixels are the cell size, and the
+    raster's edge is half a cell outside the first centre. Row 0 is at yi[0] (the south edge).
+
+    Zi is either the full grid, or an iterable of (window, tile) pairs from grid_to_geotiff together with
+    the grid's shape; tiles are written into a tiled, compressed GeoTIFF as they arrive.
+    """
+    if shape is None:
+        shape = Zi.shape
+    dx = axis_spacing(xi, axis_spacing(yi))
+    dy = axis_spacing(yi, dx)
+    transform = from_origin(xi[0] - dx / 2, yi[0] - dy / 2, dx, -dy)
+
+    # Fix issues with transform (the transform introduces a 90-degree clockwise rotation)
+    # grid_z = np.transpose(grid_z)
+    # grid_z = np.flipud(grid_z)
+
+    if isinstance(Zi, np.ndarray):
+        with rasterio.open(
+            output_path, 'w', driver='GTiff',
+            height=Zi.shape[0], width=Zi.shape[1],
+            count=1, dtype=Zi.dtype, crs=CRS.from_epsg(4326),
+            transform=transform) as dst:
+            dst.write(Zi, 1)
+    else:
+        with rasterio.open(
+            output_path, 'w', driver='GTiff',
+            height=shape[0], width=shape[1],
+            count=1, dtype='float32', nodata=np.nan, crs=CRS.from_epsg(4326),
+            transform=transform, tiled=True, blockxsize=BLOCK_SIZE, blockysize=BLOCK_SIZE,
+            compress='deflate', predictor=3, BIGTIFF='IF_SAFER') as dst:
+            for (row_off, col_off, rows, cols), tile in Zi:
+                dst.write(tile, 1, window=Window(col_off, row_off, cols, rows))
+    print(f"GeoTIFF saved to {output_path}")
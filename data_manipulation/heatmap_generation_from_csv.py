@@ -1,14 +1,14 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import geopandas as gpd
-from scipy.interpolate import griddata
 import tkinter as tk
 from tkinter import simpledialog, filedialog
-import rasterio
-from rasterio.crs import CRS
-from rasterio.transform import from_origin
 from utils import select_file, select_column
+from table_io import read_table
+from gridding import GRIDDING_METHODS, SurveyGridder, make_grid_axes, grid_to_geotiff, save_as_geotiff
+
+# Largest grid (in cells) that is gridded in memory and plotted; larger grids are tiled straight to a GeoTIFF
+MAX_PLOT_CELLS = 4_000_000
 
 def get_heatmap_labels():
     """Prompt the user for x-label, y-label, title, and legend label."""
@@ -23,23 +23,18 @@ def get_heatmap_labels():
     
     return x_label, y_label, plot_title, legend_label    
 
-def save_as_geotiff(x, y, Zi, output_path):
-    """Save the heatmap as a GeoTIFF file."""
-    transform = from_origin(x.min(), y.min(), (x.max() - x.min()) / Zi.shape[1], (y.min() - y.max()) / Zi.shape[0])
-    
-    # Fix issues with transform (the transform introduces a 90-degree clockwise rotation)
-    # grid_z = np.transpose(grid_z)
-    # grid_z = np.flipud(grid_z)  
-
-    with rasterio.open(
-        output_path, 'w', driver='GTiff',
-        height=Zi.shape[0], width=Zi.shape[1],
-        count=1, dtype=Zi.dtype, crs=CRS.from_epsg(4326),
-        transform=transform) as dst:
-        dst.write(Zi, 1)
-    print(f"GeoTIFF saved to {output_path}")
-    
-def prompt_for_export(x, y, Zi):
+def get_gridding_options():
+    """Prompt the user for the gridding method, cell size and search radius (blank for the defaults)."""
+    root = tk.Tk()
+    root.withdraw()
+
+    method = simpledialog.askstring("Input", f"Gridding method ({', '.join(GRIDDING_METHODS)}; blank for cubic):") or 'cubic'
+    cell_size = simpledialog.askfloat("Input", "Cell size in degrees (blank for a 500 x 500 grid):")
+    search_radius = simpledialog.askfloat("Input", "Search radius in degrees (blank for none):")
+
+    return method.strip().lower(), cell_size, search_radius
+
+def prompt_for_export(xi, yi, Zi):
     """Ask the user if they want to export the heatmap as GeoTIFF."""
     root = tk.Tk()
     root.withdraw()
@@ -48,56 +43,68 @@ def prompt_for_export(x, y, Zi):
     if export_format.lower() == 'yes':
         file_path = filedialog.asksaveasfilename(defaultextension=".tif", filetypes=[("GeoTIFF files", "*.tif")])
         if file_path:
-            save_as_geotiff(x, y, Zi, file_path)
+            save_as_geotiff(xi, yi, Zi, file_path)
     else:
         print("No export requested.")
 
-# Get the selected CSV file
-csv_file_path = select_file([("CSV Files", "*.csv")])
+def main():
+    # Get the selected CSV (or Parquet/Feather) file
+    csv_file_path = select_file([("Tables", "*.csv;*.parquet;*.feather")])
+
+    # Proceed only if a file was selected
+    if not csv_file_path:
+        print("No CSV file was selected. Exiting...")
+        return
 
-# Proceed only if a file was selected
-if csv_file_path:
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file_path)
+    # Read the table into a DataFrame
+    df = read_table(csv_file_path)
 
     # Prompt the user to select the column to visualize
     column_to_visualize = select_column(df, "Which column would you like to generate a heatmap for?")
-
-    if column_to_visualize:
-        # Create a GeoDataFrame
-        df.rename(columns={'Longitude': 'longitude', 'Latitude': 'latitude'}, inplace=True)
-        df['geometry'] = gpd.points_from_xy(df.longitude, df.latitude)
-        gdf = gpd.GeoDataFrame(df, geometry='geometry')
-        gdf.crs = CRS.from_epsg(4326)
-        
-        # Extract longitude, latitude, and the selected column's data
-        x = gdf.geometry.x.values
-        y = gdf.geometry.y.values
-        z = gdf[column_to_visualize].values
-
-        # Create a grid to interpolate the values onto
-        xi = np.linspace(x.min(), x.max(), 500)
-        yi = np.linspace(y.min(), y.max(), 500)
-        Xi, Yi = np.meshgrid(xi, yi)
-
-        # Interpolate the selected column's values onto the grid
-        Zi = griddata((x, y), z, (Xi, Yi), method='cubic')
-        
-        # Prompt the user for x-label, y-label, title, and legend label
-        x_label, y_label, plot_title, legend_label = get_heatmap_labels()
-
-        # Plot the interpolated heatmap
-        plt.figure(figsize=(10, 8))
-        heatmap = plt.pcolormesh(xi, yi, Zi, cmap='hsv', shading='auto')
-        plt.colorbar(heatmap).set_label(legend_label)
-        plt.xlabel(x_label)
-        plt.ylabel(y_label)
-        plt.title(plot_title)
-        plt.show()
-        
-        # Prompt the user to export the heatmap as GeoTIFF
-        prompt_for_export(x, y, Zi)
-    else:
+    if not column_to_visualize:
         print("No column was selected. Exiting...")
-else:
-    print("No CSV file was selected. Exiting...")
+        return
+
+    # Extract longitude, latitude, and the selected column's data (no geometries are needed to grid them)
+    df.rename(columns={'Longitude': 'longitude', 'Latitude': 'latitude'}, inplace=True)
+    x = df['longitude'].to_numpy(dtype='float64')
+    y = df['latitude'].to_numpy(dtype='float64')
+    z = df[column_to_visualize].to_numpy(dtype='float64')
+    del df
+
+    # Create a grid to interpolate the values onto
+    method, cell_size, search_radius = get_gridding_options()
+    xi, yi = make_grid_axes(x, y, cell_size)
+
+    # Grids too large to plot are gridded tile by tile straight into a GeoTIFF
+    if len(xi) * len(yi) > MAX_PLOT_CELLS:
+        print(f"The grid is {len(yi)} x {len(xi)} cells; it will be gridded in tiles and exported as a GeoTIFF.")
+        file_path = filedialog.asksaveasfilename(defaultextension=".tif", filetypes=[("GeoTIFF files", "*.tif")])
+        if file_path:
+            grid_to_geotiff(x, y, z, xi, yi, file_path, method, search_radius)
+        else:
+            print("No export requested.")
+        return
+
+    # Interpolate the selected column's values onto the grid
+    gridder = SurveyGridder(x, y, xi, yi, search_radius)
+    Zi = gridder.grid(z, method)
+
+    # Prompt the user for x-label, y-label, title, and legend label
+    x_label, y_label, plot_title, legend_label = get_heatmap_labels()
+
+    # Plot the interpolated heatmap
+    plt.figure(figsize=(10, 8))
+    heatmap = plt.pcolormesh(xi, yi, Zi, cmap='hsv', shading='auto')
+    plt.colorbar(heatmap).set_label(legend_label)
+    plt.xlabel(x_label)
+    plt.ylabel(y_label)
+    plt.title(plot_title)
+    plt.show()
+
+    # Prompt the user to export the heatmap as GeoTIFF
+    prompt_for_export(xi, yi, Zi)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+import re
+from functools import lru_cache
+from pyproj import Transformer
+from table_io import coordinate_columns, iter_table_chunks, open_table_writer
+
+# Source CRS assumed for tables whose folder does not name one (the airborne surveys are NAD27, from their metadata)
+DEFAULT_SOURCE_CRS = 'EPSG:4267'
+
+@lru_cache(maxsize=None)
+def get_transformer(source_crs, destination_crs):
+    """Return a cached transformer between two CRSs, with x/y in longitude/latitude (easting/northing) order."""
+    return Transformer.from_crs(source_crs, destination_crs, always_xy=True)
+
+def crs_from_folder(file_path):
+    """
+    Read a table's CRS from the EPSG_xxxx folder the organizer sorted it into.
+
+    Returns:
+    str: e.g. "EPSG:4267", or None if no folder on the path names an EPSG code.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    while True:
+        match = re.fullmatch(r'EPSG_(\d+)', os.path.basename(folder))
+        if match:
+            return f"EPSG:{match.group(1)}"
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+def reproject_table(input_path, output_path, source_crs, destination_crs='EPSG:4326', chunk_rows=500_000):
+    """
+    Reproject the coordinates of a CSV, Parquet or Feather table, streaming it chunk by chunk.
+
+    Only the two coordinate arrays are transformed; no geometries are built. The transformed coordinates
+    are written to Longitude/Latitude (added if the table has X/Y columns instead) and every other
+    column is kept as is. The output has the same format as the input.
+
+    Returns:
+    bool: True if the table was reprojected, False if it has no coordinate columns.
+    """
+    transformer = get_transformer(source_crs, destination_crs)
+    columns = None
+    with open_table_writer(output_path) as write:
+        for chunk in iter_table_chunks(input_path, chunk_rows):
+            if columns is None:
+                columns = coordinate_columns(chunk.columns)
+                if columns is None:
+                    break
+            x_column, y_column = columns
+            longitude, latitude = transformer.transform(chunk[x_column].to_numpy(dtype='float64'),
+                                                        chunk[y_column].to_numpy(dtype='float64'))
+            chunk = chunk.assign(Longitude=longitude, Latitude=latitude)
+            write(chunk)
+
+    if columns is None:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+    return True
+
+def reproject_file(input_path, output_dir, destination_crs='EPSG:4326', chunk_rows=500_000):
+    """
+    Reproject one table into output_dir, taking its source CRS from its EPSG_xxxx folder.
+
+    Errors are printed rather than raised, so one bad file does not stop a batch.
+
+    Returns:
+    str: Path of the reprojected table, or None if it was skipped or failed.
+    """
+    try:
+        # Check if the file is empty
+        if os.stat(input_path).st_size == 0:
+            print(f"Skipped empty file: {input_path}")
+            return None
+
+        source_crs = crs_from_folder(input_path)
+        if source_crs is None:
+            print(f"No EPSG folder for {input_path}; assuming {DEFAULT_SOURCE_CRS}.")
+            source_crs = DEFAULT_SOURCE_CRS
+
+        output_path = os.path.join(output_dir, os.path.basename(input_path))
+        if not reproject_table(input_path, output_path, source_crs, destination_crs, chunk_rows):
+            print(f"Skipped file with no coordinates: {input_path}")
+            return None
+
+        print(f"Converted {input_path} from {source_crs} to {destination_crs}.")
+        return output_path
+
+    except Exception as e:
+        print(f"Error converting {input_path}: {e}")
+        return None
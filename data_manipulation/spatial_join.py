@@ -0,0 +1,125 @@
+import os
+import argparse
+import numpy as np
+import geopandas as gpd
+from shapely import STRtree, points
+from sklearn.neighbors import BallTree
+from table_io import read_table, write_table, coordinate_columns
+
+# Mean Earth radius (IUGG), used to turn haversine distances in radians into metres
+EARTH_RADIUS_M = 6_371_008.8
+
+def nearest_point_features(lon, lat, feature_lon, feature_lat):
+    """
+    Find the nearest point feature to each point with a BallTree on the haversine (great-circle) distance.
+
+    Args:
+    lon, lat (numpy.ndarray): Query point coordinates, in degrees.
+    feature_lon, feature_lat (numpy.ndarray): Feature coordinates, in degrees.
+
+    Returns:
+    tuple of numpy.ndarray: Index of the nearest feature and distance to it in metres, for each query point.
+    """
+    tree = BallTree(np.radians(np.column_stack([feature_lat, feature_lon])), metric='haversine')
+    distances, indices = tree.query(np.radians(np.column_stack([lat, lon])), k=1)
+    return indices[:, 0], distances[:, 0] * EARTH_RADIUS_M
+
+def nearest_geometry_features(lon, lat, layer):
+    """
+    Find the nearest line or polygon feature to each point with an STRtree.
+
+    Points and features are projected to an azimuthal equidistant projection centred on the points,
+    so the distances are in metres and accurate at the scale of a state.
+
+    Args:
+    lon, lat (numpy.ndarray): Query point coordinates, in degrees (EPSG:4326).
+    layer (geopandas.GeoDataFrame): The features, in EPSG:4326.
+
+    Returns:
+    tuple of numpy.ndarray: Index of the nearest feature, distance to it in metres (0 inside a polygon)
+                            and whether the point lies within any feature.
+    """
+    local_crs = f"+proj=aeqd +lat_0={np.mean(lat)} +lon_0={np.mean(lon)} +datum=WGS84 +units=m"
+    query_points = gpd.GeoSeries(points(lon, lat), crs='EPSG:4326').to_crs(local_crs).values
+    geometries = layer.geometry.to_crs(local_crs).values
+
+    tree = STRtree(geometries)
+    (point_index, feature_index), distances = tree.query_nearest(query_points, return_distance=True, all_matches=False)
+    nearest = np.full(len(query_points), -1)
+    distance = np.full(len(query_points), np.nan)
+    nearest[point_index] = feature_index
+    distance[point_index] = distances
+
+    within = np.zeros(len(query_points), dtype=bool)
+    within[np.unique(tree.query(query_points, predicate='within')[0])] = True
+    return nearest, distance, within
+
+def join_nearest(df, layer, prefix, name_column=None):
+    """
+    Attach the nearest feature of a layer, and its distance, to every point of a table.
+
+    Point layers are searched with a BallTree on great-circle distance; line and polygon layers with an STRtree.
+
+    Args:
+    df (pandas.DataFrame): Points with Longitude/Latitude (or X/Y) columns in EPSG:4326.
+    layer (geopandas.GeoDataFrame): The features, in EPSG:4326.
+    prefix (str): Prefix of the added columns (e.g. the layer name).
+    name_column (str): Optional layer attribute copied for the nearest feature (e.g. a deposit name).
+
+    Returns:
+    pandas.DataFrame: A copy of df with <prefix>_index, <prefix>_distance_m, optionally <prefix>_<name_column>,
+                      and, for polygon layers, <prefix>_within.
+    """
+    columns = coordinate_columns(df.columns)
+    if columns is None:
+        raise ValueError("The points have no Longitude/Latitude or X/Y columns.")
+    lon = df[columns[0]].to_numpy(dtype='float64')
+    lat = df[columns[1]].to_numpy(dtype='float64')
+
+    layer = layer[~layer.geometry.is_empty & layer.geometry.notna()].reset_index(drop=True)
+    df = df.copy()
+    if (layer.geom_type == 'Point').all():
+        nearest, distance = nearest_point_features(lon, lat, layer.geometry.x.to_numpy(), layer.geometry.y.to_numpy())
+        within = None
+    else:
+        nearest, distance, within = nearest_geometry_features(lon, lat, layer)
+
+    df[f"{prefix}_index"] = nearest
+    df[f"{prefix}_distance_m"] = distance
+    if name_column:
+        df[f"{prefix}_{name_column}"] = layer[name_column].to_numpy()[nearest]
+    if within is not None and layer.geom_type.isin(['Polygon', 'MultiPolygon']).any():
+        df[f"{prefix}_within"] = within
+    return df
+
+def load_layer(shapefile_path):
+    """Read a vector layer and make sure it is in EPSG:4326 (layers without a CRS are assumed to be)."""
+    layer = gpd.read_file(shapefile_path)
+    if layer.crs is not None and layer.crs.to_epsg() != 4326:
+        layer = layer.to_crs(epsg=4326)
+    return layer
+
+def main():
+    parser = argparse.ArgumentParser(description="Attach the nearest feature of each vector layer (and its distance) to a table of points, e.g. detected anomalies.")
+    parser.add_argument('points', help="CSV, Parquet or Feather table of points in EPSG:4326 (e.g. the anomaly detection output).")
+    parser.add_argument('layers', nargs='+', help="Point, line or polygon shapefiles to join.")
+    parser.add_argument('--name-column', help="Layer attribute to copy for the nearest feature, if the layer has it.")
+    parser.add_argument('--output', help="Output table (default: <points>_joined with the same extension).")
+    args = parser.parse_args()
+
+    df = read_table(args.points)
+    for shapefile_path in args.layers:
+        layer = load_layer(shapefile_path)
+        prefix = os.path.splitext(os.path.basename(shapefile_path))[0]
+        name_column = args.name_column if args.name_column in layer.columns else None
+        df = join_nearest(df, layer, prefix, name_column)
+        print(f"Joined {shapefile_path}: median distance to the nearest feature {np.nanmedian(df[f'{prefix}_distance_m']):.0f} m")
+
+    base_name, ext = os.path.splitext(args.points)
+    output_path = args.output or f"{base_name}_joined{ext}"
+    write_table(df, output_path)
+    print(f"Joined points saved to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from table_io import iter_table_chunks
+
+class Moments:
+    """
+    Count, min, max, mean and the 2nd to 4th central moments of a stream of numbers, in one pass.
+
+    Chunks are summarised with a few vectorized reductions and combined with the pairwise update of
+    Pébay (2008), so accumulators built on separate chunks or files merge exactly.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = self.m3 = self.m4 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        chunk = Moments()
+        chunk.n = len(values)
+        chunk.min, chunk.max = values.min(), values.max()
+        chunk.mean = values.mean()
+        deviations = values - chunk.mean
+        squares = deviations * deviations
+        chunk.m2 = squares.sum()
+        chunk.m3 = (squares * deviations).sum()
+        chunk.m4 = (squares * squares).sum()
+        self.merge(chunk)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta2 * delta * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.mean += delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.n = n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def var(self):
+        """Sample variance (ddof=1), as pandas."""
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def std(self):
+        return math.sqrt(self.var()) if self.n > 1 else np.nan
+
+    def skew(self):
+        """Bias-corrected sample skewness, as pandas.Series.skew."""
+        n = self.n
+        if n < 3:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        return math.sqrt(n * (n - 1)) / (n - 2) * (self.m3 / n) / (self.m2 / n) ** 1.5
+
+    def kurt(self):
+        """Bias-corrected excess kurtosis, as pandas.Series.kurt."""
+        n = self.n
+        if n < 4:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        return (n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2)
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty, 2016) over a stream of numbers.
+
+    Items live in levels; an item at level h stands for 2**h original values. A level over capacity is
+    sorted and every other item (from a random offset) is promoted to the next level. The rank error is
+    about 1.7/k of the count; until the first compaction the sketch is exact.
+
+    Args:
+    k (int): Capacity of the top level; larger is more accurate.
+    seed (int): Seed for the compaction offsets, so results are reproducible.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind, so the weight is preserved exactly
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def count(self):
+        return sum(len(items) << level for level, items in enumerate(self.levels))
+
+    def quantile(self, q):
+        """Return the approximate q-quantile (exact, interpolated as pandas, before any compaction)."""
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q) if len(self.levels[0]) else np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 1 << level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1])
+        return items[order][min(index, len(items) - 1)]
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary (Metwally et al., 2005), for the mode of a stream.
+
+    Each chunk is counted exactly and merged into at most `capacity` counters; counters that fall out
+    leave their count as the error bound of the items that replace them (the mergeable variant of
+    Agarwal et al., 2012).
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        self.merge_counts(dict(zip(counts.index, counts.to_numpy())))
+
+    def merge(self, other):
+        self.merge_counts(other.counts)
+        return self
+
+    def merge_counts(self, counts):
+        for item, count in counts.items():
+            self.counts[item] = self.counts.get(item, 0) + int(count)
+        if len(self.counts) > self.capacity:
+            ranked = sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)
+            floor = ranked[self.capacity][1]
+            self.counts = {item: count - floor for item, count in ranked[:self.capacity] if count > floor}
+
+    def most_common(self, n=1):
+        return sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)[:n]
+
+    def mode(self):
+        top = self.most_common(1)
+        return top[0][0] if top else None
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch (Flajolet et al., 2007), with linear counting for small counts.
+
+    Values are hashed with pandas' stable hash, so sketches built in different processes merge.
+
+    Args:
+    p (int): log2 of the number of registers; the standard error is about 1.04 / sqrt(2**p).
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        series = pd.Series(values).dropna()
+        if series.empty:
+            return
+        hashes = pd.util.hash_array(series.to_numpy())
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # The remaining 64 - p bits are exact as floats, so frexp gives their bit length
+        rest = (hashes & np.uint64((1 << (64 - self.p)) - 1)).astype('float64')
+        rank = (64 - self.p) - np.frexp(rest)[1] + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+class ColumnProfile:
+    """
+    Mergeable single-pass profile of one column: moments (numeric columns), quantiles, mode and distinct count.
+
+    Args:
+    numeric (bool): Whether the column holds numbers; text columns only get a mode and distinct count.
+    """
+
+    def __init__(self, numeric):
+        self.numeric = numeric
+        self.rows = 0
+        self.missing = 0
+        self.moments = Moments() if numeric else None
+        self.quantiles = KLLSketch() if numeric else None
+        self.heavy_hitters = SpaceSaving()
+        self.distinct = HyperLogLog()
+
+    def update(self, series):
+        if self.numeric and not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        self.rows += len(series)
+        self.missing += int(series.isna().sum())
+        if self.numeric:
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            self.moments.update(values)
+            self.quantiles.update(values)
+        self.heavy_hitters.update(series)
+        self.distinct.update(series)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        if self.numeric and other.numeric:
+            self.moments.merge(other.moments)
+            self.quantiles.merge(other.quantiles)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.distinct.merge(other.distinct)
+        return self
+
+    def summary(self):
+        """Return the statistics as a dict (the median and quantiles are approximate on large inputs)."""
+        summary = {'Rows': self.rows, 'Missing': self.missing, 'Distinct (approx.)': self.distinct.count()}
+        if self.numeric:
+            summary.update({
+                'Min': self.moments.min if self.moments.n else np.nan,
+                'Max': self.moments.max if self.moments.n else np.nan,
+                'Mean': self.moments.mean if self.moments.n else np.nan,
+                'Median': self.quantiles.quantile(0.5),
+                'P05': self.quantiles.quantile(0.05),
+                'P95': self.quantiles.quantile(0.95),
+            })
+        mode = self.heavy_hitters.mode()
+        summary['Mode'] = mode if mode is not None else 'N/A'
+        if self.numeric:
+            summary.update({
+                'Standard Deviation': self.moments.std(),
+                'Variance': self.moments.var(),
+                'Skewness': self.moments.skew(),
+                'Kurtosis': self.moments.kurt(),
+            })
+        return summary
+
+def is_profiled_type(series):
+    """Check whether a column is numeric or text, the two kinds that get profiled."""
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_object_dtype(series) \
+        or isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series)
+
+def profile_frame(df, columns=None, profiles=None):
+    """
+    Update (or start) the profiles of a DataFrame's columns with one chunk.
+
+    Args:
+    df (pandas.DataFrame): The chunk.
+    columns (list): Columns to profile (default: all numeric and text columns).
+    profiles (dict): Profiles from earlier chunks, updated in place.
+
+    Returns:
+    dict: Column name -> ColumnProfile.
+    """
+    profiles = {} if profiles is None else profiles
+    for column in columns if columns is not None else df.columns:
+        series = df[column]
+        if column not in profiles:
+            if not is_profiled_type(series):
+                continue
+            profiles[column] = ColumnProfile(pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series))
+        profiles[column].update(series)
+    return profiles
+
+def profile_table(file_path, columns=None, chunk_rows=500_000):
+    """Profile a CSV, Parquet or Feather table chunk by chunk; memory stays bounded by the chunk size."""
+    profiles = {}
+    for chunk in iter_table_chunks(file_path, chunk_rows, columns=columns):
+        profile_frame(chunk, columns, profiles)
+    return profiles
+
+def merge_profiles(profile_sets):
+    """Merge several {column: ColumnProfile} dicts (e.g. one per file) into one."""
+    merged = {}
+    for profiles in profile_sets:
+        for column, profile in profiles.items():
+            if column in merged:
+                merged[column].merge(profile)
+            else:
+                merged[column] = profile
+    return merged
+
+def profile_tables(file_paths, columns=None, chunk_rows=500_000, workers=None):
+    """
+    Profile several tables in parallel, one process per file.
+
+    Returns:
+    dict: File path -> {column: ColumnProfile}; merge_profiles combines them.
+    """
+    workers = workers or os.cpu_count()
+    if workers > 1 and len(file_paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as executor:
+            results = executor.map(profile_table, file_paths, [columns] * len(file_paths), [chunk_rows] * len(file_paths))
+            return dict(zip(file_paths, results))
+    return {file_path: profile_table(file_path, columns, chunk_rows) for file_path in file_paths}
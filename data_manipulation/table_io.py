@@ -0,0 +1,422 @@
+import os
+import re
+import json
+import codecs
+from contextlib import contextmanager
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Tabular formats written by the organization stage (see data_organization/table_writer.py)
+TABLE_EXTENSIONS = ('.csv', '.parquet', '.feather')
+
+# Default location of the cached CSV schemas, next to the processed data (like the spatial catalog)
+SCHEMA_CACHE_PATH = os.path.join('..', 'data', 'processed', 'table_schemas.json')
+
+# Bytes read from the start of a CSV to guess its encoding
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+# Survey columns holding codes rather than measurements (e.g. "Geology (coded)", "Quality flag"), kept as categoricals
+CODED_COLUMN_PATTERN = re.compile(r'cod(e|ed)\b|flag', re.IGNORECASE)
+
+def is_table_file(file_path):
+    """Check whether a file is a CSV, Parquet or Feather table."""
+    return file_path.lower().endswith(TABLE_EXTENSIONS)
+
+def read_table(file_path, **kwargs):
+    """
+    Read a CSV, Parquet or Feather table into a DataFrame, based on the file extension.
+
+    CSVs are read with the encoding guessed from their first bytes, falling back to ISO-8859-1 if that fails.
+    Extra keyword arguments (e.g. columns=[...] for the columnar formats) are passed on to the pandas reader.
+    See load_table for a faster reader that loads only the columns it is asked for.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.parquet':
+        return pd.read_parquet(file_path, **kwargs)
+    if ext == '.feather':
+        return pd.read_feather(file_path, **kwargs)
+    if ext == '.csv':
+        try:
+            return pd.read_csv(file_path, encoding=sniff_encoding(file_path), **kwargs)
+        except UnicodeDecodeError:
+            print(f"UTF-8 decoding failed for {file_path}, trying ISO-8859-1.")
+            return pd.read_csv(file_path, encoding='ISO-8859-1', **kwargs)
+    raise ValueError(f"Unsupported table format: {file_path}")
+
+def write_table(df, file_path):
+    """Write a DataFrame as CSV, Parquet or Feather, based on the file extension."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.parquet':
+        df.to_parquet(file_path, index=False)
+    elif ext == '.feather':
+        df.reset_index(drop=True).to_feather(file_path)
+    elif ext == '.csv':
+        df.to_csv(file_path, index=False)
+    else:
+        raise ValueError(f"Unsupported table format: {file_path}")
+
+def csv_encoding(file_path, block_size=1024 * 1024):
+    """
+    Return the encoding a CSV should be read with: UTF-8 if the whole file decodes as UTF-8, ISO-8859-1 otherwise.
+
+    The check decodes the raw bytes block by block, so it is much cheaper than a failed parse.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'ISO-8859-1'
+    return 'utf-8'
+
+def sniff_encoding(file_path, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    Guess a CSV's encoding from its first bytes: UTF-8 (with or without a byte order mark) if they decode, ISO-8859-1 otherwise.
+
+    Only the sample is decoded; a character cut off at the end of the sample does not count as an error.
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+    except UnicodeDecodeError:
+        return 'ISO-8859-1'
+    return 'utf-8'
+
+def read_schema_cache(cache_path=SCHEMA_CACHE_PATH):
+    """Read the cached CSV schemas: {absolute path: {'size', 'mtime', 'encoding', 'dtypes': {column: dtype}}}."""
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def cached_schema(file_path, cache_path=SCHEMA_CACHE_PATH):
+    """Return a CSV's cached schema, or None if it was never loaded or has changed since."""
+    entry = read_schema_cache(cache_path).get(os.path.abspath(file_path))
+    stat = os.stat(file_path)
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+        return entry
+    return None
+
+def update_schema_cache(file_path, encoding, dtypes, cache_path=SCHEMA_CACHE_PATH):
+    """Record a CSV's encoding and column types, keeping the types of columns cached by earlier loads."""
+    stat = os.stat(file_path)
+    cache = read_schema_cache(cache_path)
+    key = os.path.abspath(file_path)
+    entry = cache.get(key)
+    if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'dtypes': {}}
+    entry['encoding'] = encoding
+    entry['dtypes'].update(dtypes)
+    cache[key] = entry
+
+    # Written to a temporary file first, so an interrupted write never leaves a broken cache
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(temporary_path, cache_path)
+
+def _has_binary_columns(df):
+    """Check whether the pyarrow CSV engine left undecodable text as bytes, which it does instead of failing."""
+    for column in df.columns:
+        if df[column].dtype == object:
+            values = df[column].dropna()
+            if len(values) and isinstance(values.iloc[0], bytes):
+                return True
+    return False
+
+def load_table(file_path, columns=None, dtype=None, cache_path=SCHEMA_CACHE_PATH, compact=False):
+    """
+    Load a table quickly, reading only the requested columns.
+
+    CSVs are parsed with pandas' multithreaded pyarrow engine (the default engine if pyarrow is missing).
+    The encoding is guessed from a leading byte sample rather than by a failed parse. The encoding and
+    the column types found on the first load are cached per file, so later loads pass them to the parser
+    instead of inferring them again. Parquet and Feather files carry their own schema.
+
+    Args:
+    file_path (str): CSV, Parquet or Feather table.
+    columns (list): Columns to load (default: all).
+    dtype (dict): Column types, overriding the cached ones.
+    cache_path (str): JSON file of cached CSV schemas, or None not to cache.
+    compact (bool): Shrink the column types with compact_frame (the columns given in dtype are left as asked).
+
+    Returns:
+    pandas.DataFrame: The table.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext != '.csv':
+        df = read_table(file_path, columns=columns)
+        if dtype:
+            df = df.astype(dtype)
+        return compact_frame(df, keep=list(dtype or {})) if compact else df
+
+    entry = cached_schema(file_path, cache_path) if cache_path else None
+    encoding = entry['encoding'] if entry else sniff_encoding(file_path)
+    dtypes = {column: column_type for column, column_type in (entry['dtypes'] if entry else {}).items()
+              if columns is None or column in columns}
+    dtypes.update(dtype or {})
+
+    try:
+        import pyarrow  # noqa: F401 (pandas' pyarrow engine needs it)
+        engine = 'pyarrow'
+    except ImportError:
+        engine = 'c'
+
+    def parse(encoding):
+        return pd.read_csv(file_path, engine=engine, encoding=encoding, usecols=columns, dtype=dtypes or None)
+
+    # Bytes past the sample can still fail to decode: the default engine raises, the pyarrow engine returns bytes
+    try:
+        df = parse(encoding)
+        decoded = not _has_binary_columns(df)
+    except UnicodeDecodeError:
+        decoded = False
+    if not decoded:
+        encoding = 'ISO-8859-1'
+        print(f"UTF-8 decoding failed for {file_path} past the sampled bytes, reading as {encoding}.")
+        df = parse(encoding)
+
+    if cache_path:
+        inferred = {str(column): str(column_type) for column, column_type in df.dtypes.items()
+                    if pd.api.types.is_numeric_dtype(column_type) and column not in (dtype or {})}
+        update_schema_cache(file_path, encoding, inferred, cache_path)
+    return compact_frame(df, keep=list(dtype or {})) if compact else df
+
+def compact_frame(df, keep=(), max_category_ratio=0.5):
+    """
+    Shrink a survey frame's column types, roughly halving its memory.
+
+    Coded columns (names matching CODED_COLUMN_PATTERN) and repetitive text columns become categoricals,
+    other integer columns are downcast to the smallest integer type that holds them, and floats become
+    float32. Coordinates stay float64, as float32 would round them to about a metre.
+
+    Args:
+    df (pandas.DataFrame): The frame, converted in place column by column.
+    keep (list): Columns to leave as they are.
+    max_category_ratio (float): Text columns become categoricals if their distinct values are at most
+                                this fraction of the rows.
+
+    Returns:
+    pandas.DataFrame: The same frame, compacted.
+    """
+    keep = set(keep) | set(coordinate_columns(df.columns) or ())
+    for column in df.columns:
+        if column in keep:
+            continue
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_numeric_dtype(series) and CODED_COLUMN_PATTERN.search(str(column)):
+            df[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = series.astype('float32')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique() <= max_category_ratio * len(series):
+                df[column] = series.astype('category')
+    return df
+
+def concat_frames(frames):
+    """
+    Concatenate compacted frames into a new frame, keeping their categorical columns categorical.
+
+    pandas falls back to object columns when categoricals have different categories, which would undo
+    compact_frame; the categories are unioned first so the result stays compact. The frames passed in are
+    left unchanged: the recoded columns go into shallow copies of them, and pd.concat copies the data into
+    the result once.
+    """
+    frames = list(frames)
+    for column in set.intersection(*(set(frame.columns) for frame in frames)) if frames else ():
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = union_categoricals([frame[column] for frame in frames], ignore_order=True).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+def table_columns(file_path):
+    """
+    Return a table's column names without reading its rows.
+
+    CSV headers are decoded as ISO-8859-1, which never fails; ASCII names come out the same in either encoding.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        return list(pd.read_csv(file_path, nrows=0, encoding='ISO-8859-1').columns)
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_path).names
+    if ext == '.feather':
+        import pyarrow as pa
+        with pa.memory_map(file_path) as source:
+            return pa.ipc.open_file(source).schema.names
+    raise ValueError(f"Unsupported table format: {file_path}")
+
+def coordinate_columns(columns):
+    """
+    Find the coordinate columns of a table, case-insensitively.
+
+    Returns:
+    tuple: (x column, y column) for Longitude/Latitude or X/Y columns, or None if the table has neither.
+    """
+    by_lower = {column.lower(): column for column in columns}
+    for x_name, y_name in (('longitude', 'latitude'), ('x', 'y')):
+        if x_name in by_lower and y_name in by_lower:
+            return by_lower[x_name], by_lower[y_name]
+    return None
+
+def iter_table_chunks(file_path, chunk_rows=500_000, columns=None, **kwargs):
+    """
+    Read a CSV, Parquet or Feather table as a sequence of DataFrames of at most chunk_rows rows.
+
+    Only one chunk is held in memory at a time, and only the requested columns (all by default) are read.
+    Extra keyword arguments are passed on to pandas.read_csv for CSVs.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        encoding = csv_encoding(file_path)
+        if encoding != 'utf-8':
+            print(f"UTF-8 decoding failed for {file_path}, reading as {encoding}.")
+        with pd.read_csv(file_path, encoding=encoding, chunksize=chunk_rows, usecols=columns, **kwargs) as reader:
+            yield from reader
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif ext == '.feather':
+        import pyarrow as pa
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for offset in range(0, batch.num_rows, chunk_rows):
+                    yield batch.slice(offset, chunk_rows).to_pandas()
+    else:
+        raise ValueError(f"Unsupported table format: {file_path}")
+
+def read_rows(file_paths, positions, chunk_rows=500_000):
+    """
+    Read the rows at the given positions of several tables taken end to end, streaming them chunk by chunk.
+
+    Positions count rows across the tables in order, the way concat_frames numbers them, so the rows of a
+    frame loaded with only a few columns can be read back in full.
+
+    Returns:
+    pandas.DataFrame: The rows with all their columns, indexed by their position.
+    """
+    wanted = pd.Index(positions)
+    frames = []
+    offset = 0
+    for file_path in file_paths:
+        for chunk in iter_table_chunks(file_path, chunk_rows):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            # The first chunk's empty slice keeps the columns when no row is wanted
+            rows = chunk[chunk.index.isin(wanted)]
+            if len(rows) or not frames:
+                frames.append(rows)
+    return pd.concat(frames) if frames else pd.DataFrame()
+
+@contextmanager
+def open_table_writer(file_path):
+    """
+    Open a CSV, Parquet or Feather file (based on the extension) for writing DataFrames chunk by chunk.
+
+    The table is written to a temporary file that replaces file_path once every chunk is written, so an
+    error never leaves a partial output behind.
+
+    Yields:
+    function: write(df). Every chunk must have the same columns. For the columnar formats, later chunks
+              are cast to the types written so far; if a chunk needs wider types (e.g. floats in a column
+              that held integers), the rows written so far are rewritten with the widened types.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in TABLE_EXTENSIONS:
+        raise ValueError(f"Unsupported table format: {file_path}")
+    temporary_path = f"{file_path}.{os.getpid()}.tmp"
+
+    try:
+        if ext == '.csv':
+            with open(temporary_path, 'w', newline='') as f:
+                header = True
+
+                def write(df):
+                    nonlocal header
+                    df.to_csv(f, index=False, header=header)
+                    header = False
+
+                yield write
+        else:
+            with _columnar_table_writer(temporary_path, ext) as write:
+                yield write
+        os.replace(temporary_path, file_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+@contextmanager
+def _columnar_table_writer(file_path, ext):
+    """Write DataFrames to a Parquet or Feather file, widening its schema when a chunk needs it (see open_table_writer)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    schema = None
+    # A widened copy is written next to the file, and moved over it once the writer is closed
+    current_path = file_path
+
+    def new_writer(path, schema):
+        return pq.ParquetWriter(path, schema) if ext == '.parquet' else pa.ipc.new_file(path, schema)
+
+    def written_batches(path):
+        if ext == '.parquet':
+            yield from pq.ParquetFile(path).iter_batches()
+        else:
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i)
+
+    def widen(new_schema):
+        """Copy the rows written so far into a file with a wider schema, and carry on writing to that file."""
+        nonlocal writer, schema, current_path
+        writer.close()
+        widened_path = f"{file_path}.widened" if current_path == file_path else file_path
+        widened_writer = new_writer(widened_path, new_schema)
+        try:
+            for batch in written_batches(current_path):
+                widened_writer.write_table(pa.Table.from_batches([batch]).cast(new_schema))
+        except BaseException:
+            widened_writer.close()
+            os.remove(widened_path)
+            raise
+        os.remove(current_path)
+        writer, schema, current_path = widened_writer, new_schema, widened_path
+
+    def write(df):
+        nonlocal writer, schema
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            writer = new_writer(file_path, schema)
+        elif table.schema != schema:
+            unified = pa.unify_schemas([schema, table.schema], promote_options='permissive')
+            if unified != schema:
+                widen(unified)
+            table = table.cast(schema)
+        writer.write_table(table)
+
+    try:
+        yield write
+    finally:
+        if writer is not None:
+            writer.close()
+        if current_path != file_path:
+            os.replace(current_path, file_path)
@@ -4,6 +4,7 @@ import tkinter as tk
 from tkinter import filedialog, simpledialog
 import tkinter as tk
 from tkinter import filedialog
+from table_io import is_table_file, load_table
 
 def select_file(filetype=None):
     """
@@ -12,7 +13,7 @@ def select_file(filetype=None):
     Parameters:
     filetype (list of tuples): Optional parameter to specify file types. 
                                Format: [("Description", "*.extension"), ...].
-                               If None, defaults to CSV and Shapefiles.
+                               If None, defaults to tables (CSV, Parquet, Feather) and Shapefiles.
     
     Returns:
     str: The file path of the selected file.
@@ -22,7 +23,7 @@ def select_file(filetype=None):
 
     # Default to CSV and Shapefiles if no filetype is provided
     if filetype is None:
-        filetype = [("CSV and Shapefiles", "*.csv;*.shp")]
+        filetype = [("Tables and Shapefiles", "*.csv;*.parquet;*.feather;*.shp")]
     
     # Open file dialog to select a file based on the provided or default file type
     file_path = filedialog.askopenfilename(
@@ -37,18 +38,22 @@ def select_file(filetype=None):
     return file_path
 
 
-def load_file(file_path):
-    """Load the selected file into a DataFrame or GeoDataFrame."""
-    if file_path.lower().endswith('.csv'):
-        # Try reading the CSV with UTF-8 encoding first, and fallback to ISO-8859-1 if it fails
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            print(f"UTF-8 decoding failed for {file_path}, trying ISO-8859-1.")
-            df = pd.read_csv(file_path, encoding='ISO-8859-1')
+def load_file(file_path, columns=None, dtype=None, compact=False):
+    """
+    Load the selected file into a DataFrame or GeoDataFrame.
+
+    Parameters:
+    file_path (str): Table (CSV, Parquet, Feather) or Shapefile.
+    columns (list): Optional columns to load; for tables, only these are parsed.
+    dtype (dict): Optional column types for tables, e.g. {'Flight line number': 'int32'}.
+    compact (bool): Shrink table column types (float32, small integers, categorical codes) to save memory.
+    """
+    if is_table_file(file_path):
+        # CSV (encoding sniffed, multithreaded parse, cached schema), Parquet or Feather
+        df = load_table(file_path, columns, dtype, compact=compact)
     elif file_path.lower().endswith('.shp'):
         # Load Shapefile into geopandas GeoDataFrame
-        df = gpd.read_file(file_path)
+        df = gpd.read_file(file_path, columns=columns) if columns else gpd.read_file(file_path)
     else:
         print(f"Unsupported file type: {file_path}")
         return None
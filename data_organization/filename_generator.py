@@ -1,17 +1,19 @@
 import os
+import sys
+
+# The spatial catalog lives with the data_manipulation scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_manipulation'))
+from catalog import open_catalog, index_folder, find_layers
 
 def list_shapefiles_and_csvs(directory, output_file):
-    """Traverse through the directory and list all shapefiles and CSV files."""
-    shapefiles = []
-    csv_files = []
+    """List all shapefiles and CSV files in the directory, from the spatial catalog."""
+    # Bring the catalog up to date; only new and changed files are read
+    catalog = open_catalog()
+    index_folder(catalog, directory)
 
-    # Walk through the directory and its subdirectories
-    for _, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".shp"):
-                shapefiles.append(file)  # Add only the filename
-            elif file.endswith(".csv"):
-                csv_files.append(file)  # Add only the filename
+    layers = find_layers(catalog, kind=('shapefile', 'table'), folder=directory)
+    shapefiles = [os.path.basename(layer['path']) for layer in layers if layer['kind'] == 'shapefile']  # Add only the filename
+    csv_files = [os.path.basename(layer['path']) for layer in layers if layer['path'].endswith(".csv")]  # Add only the filename
     
     # Write the filenames to the output text file
     with open(output_file, 'w') as f:
@@ -0,0 +1,57 @@
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows; peak RSS is then reported as None
+
+# Per-file timings recorded while the handlers run: (seconds, stage, path)
+_file_times = []
+
+def record_file_time(path, stage, seconds):
+    """Record how long one stage (a conversion job or a move) took for a file."""
+    _file_times.append((seconds, stage, path))
+
+def file_times_mark():
+    """Return a marker for the file timings recorded so far, to pass to handler_metrics."""
+    return len(_file_times)
+
+def peak_rss_mb(who='self'):
+    """
+    Return the peak resident set size in MB of this process ('self') or of its finished worker processes ('children').
+
+    The peak is the largest seen so far, so it never goes down from one handler to the next.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kB elsewhere
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+def handler_metrics(result, wall_s, mark, slowest=10):
+    """
+    Summarize how a handler's batch went.
+
+    Args:
+    result (dict): The handler's result dict (see utils.new_result).
+    wall_s (float): Wall time of the batch, in seconds.
+    mark (int): file_times_mark() taken when the batch started.
+    slowest (int): Number of slowest file stages to keep.
+
+    Returns:
+    dict: Wall time, files/s, MB moved and MB/s, peak RSS of the main and worker processes,
+          and the slowest file stages (path, stage, seconds).
+    """
+    size_mb = result['size_kb'] / 1024
+    file_times = sorted(_file_times[mark:], reverse=True)[:slowest]
+    return {
+        'wall_s': round(wall_s, 3),
+        'files': result['files'],
+        'files_per_s': round(result['files'] / wall_s, 2) if wall_s > 0 else None,
+        'size_mb': round(size_mb, 3),
+        'mb_per_s': round(size_mb / wall_s, 2) if wall_s > 0 else None,
+        'peak_rss_mb': peak_rss_mb('self'),
+        'peak_rss_workers_mb': peak_rss_mb('children'),
+        'slowest_files': [{'path': path, 'stage': stage, 'seconds': round(seconds, 3)} for seconds, stage, path in file_times],
+    }
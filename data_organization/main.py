@@ -1,70 +1,149 @@
 import os
-from process_shapefile import process_shapefile
-from process_tiff import process_tiff
-from process_gdb import process_gdb
-from process_xyz import process_xyz
-from process_ers import process_ers
-from process_csv import process_csv
-from process_other import process_other
-from utils import count_folders
-
-# Define root folder and processed folders
-root_folder = '../data'
-processed_folder = os.path.join(root_folder, 'processed')
-vector_data_folder = os.path.join(processed_folder, 'vector_data')
-raster_data_folder = os.path.join(processed_folder, 'raster_data')
-other_data_folder = os.path.join(processed_folder, 'other_data')
-empty_data_folder = os.path.join(processed_folder, 'empty_data')
-
-# Ensure directories exist
-os.makedirs(processed_folder, exist_ok=True)
-os.makedirs(vector_data_folder, exist_ok=True)
-os.makedirs(raster_data_folder, exist_ok=True)
-os.makedirs(other_data_folder, exist_ok=True)
-os.makedirs(empty_data_folder, exist_ok=True)
-
-# Initialize total counts
-total_shapefiles = 0
-total_tiffs = 0
-total_gdb = 0
-total_xyz = 0
-total_ers = 0
-total_csv = 0
-total_pdf = 0
-total_other = 0
-new_folders = 1 # Accounts for the "processed" folder
-
-# Initialize skipped counts and total size
-total_skipped = 0
-total_size_kb = 0
-
-# Run processing functions and accumulate results
-total_shapefiles, total_skipped, total_size_kb = process_shapefile(root_folder, processed_folder, empty_data_folder, vector_data_folder, total_shapefiles, total_skipped, total_size_kb)
-total_tiffs, total_size_kb = process_tiff(root_folder, processed_folder, raster_data_folder, total_tiffs, total_size_kb)
-total_gdb, total_size_kb = process_gdb(root_folder, processed_folder, vector_data_folder, total_gdb, total_size_kb)
-total_xyz, total_skipped, total_size_kb = process_xyz(root_folder, processed_folder, empty_data_folder, vector_data_folder, total_xyz, total_skipped, total_size_kb)
-total_ers, total_skipped, total_size_kb = process_ers(root_folder, processed_folder, empty_data_folder, raster_data_folder, total_ers, total_skipped, total_size_kb)
-total_csv, total_skipped, total_size_kb = process_csv(root_folder, processed_folder, empty_data_folder, vector_data_folder, total_csv, total_skipped, total_size_kb)
-total_other, total_size_kb = process_other(root_folder, processed_folder, other_data_folder, total_other, total_size_kb)
-
-# Summary data
-summary_data = {
-    "Total shapefiles processed": total_shapefiles,
-    "Total TIFF files processed": total_tiffs,
-    "Total GDB files processed": total_gdb,
-    "Total XYZ files processed": total_xyz,
-    "Total ERS files processed": total_ers,
-    "Total CSV files processed": total_csv,
-    "Total other files processed": total_other,
-    "Total size of processed files (kB)": f"{total_size_kb:.2f}",
-    "New folders created": f"{count_folders(processed_folder)}",
-    "Total files skipped (empty)": total_skipped
-}
-
-# Write the summary file
-summary_file_path = os.path.join(processed_folder, 'summary.txt')
-with open(summary_file_path, 'w') as summary_file:
-    for label, value in summary_data.items():
-        summary_file.write(f"{label}: {value}\n")
-
-print(f"Summary written to {summary_file_path}")
\ No newline at end of file
+import sys
+import json
+import time
+import argparse
+from functools import partial
+from process_shapefile import process_shapefile, shapefile_associated_exts
+from process_tiff import process_tiff, tiff_associated_exts
+from process_gdb import process_gdb, gdb_associated_exts
+from process_xyz import process_xyz, xyz_associated_exts
+from process_ers import process_ers, ers_associated_exts
+from process_csv import process_csv, csv_associated_exts
+from process_other import process_other, other_associated_exts
+from scanner import scan_folder, dispatch
+from sidecars import index_sidecars
+from manifest import open_manifest, resume_interrupted_moves
+from utils import count_folders, new_result
+from instrumentation import peak_rss_mb
+
+# The spatial catalog is shared with the data_manipulation scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_manipulation'))
+from catalog import open_catalog, index_folder
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Organize the raw data folder into processed vector, raster, other and empty data folders.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for the per-file TIFF, ERS and XYZ conversions (default: 1).")
+    parser.add_argument('--skip-nodata', action='store_true',
+                        help="Leave pixels equal to a raster band's NoData value out of the converted CSVs.")
+    parser.add_argument('--window-rows', type=int, default=None,
+                        help="Raster rows read per strip when converting rasters (default: a whole number of native GDAL blocks).")
+    parser.add_argument('--output-format', choices=['csv', 'parquet', 'feather'], default='csv',
+                        help="Table format for converted XYZ, TIFF and ERS data. Parquet and Feather are typed, compressed and need pyarrow (default: csv).")
+    parser.add_argument('--raster-output', choices=['table', 'cog'], default='table',
+                        help="Flatten TIFF and ERS rasters into point tables in --output-format (table), or keep them as tiled, "
+                             "compressed Cloud-Optimized GeoTIFFs with overviews (cog) (default: table).")
+    parser.add_argument('--no-manifest', action='store_true',
+                        help="Process everything found without reading or updating the ingestion manifest (processed/manifest.sqlite).")
+    parser.add_argument('--no-catalog', action='store_true',
+                        help="Do not record the processed layers in the spatial catalog (processed/catalog.sqlite).")
+    return parser.parse_args(argv)
+
+def organize(root_folder, args):
+    """
+    Organize a raw data folder into its 'processed' subfolder and write summary.txt and summary.json there.
+
+    Args:
+    root_folder (str): The raw data folder.
+    args (argparse.Namespace): Options, as returned by parse_args.
+
+    Returns:
+    dict: Handler name mapped to the result dict it returned (see scanner.dispatch).
+    """
+    start = time.perf_counter()
+
+    # Define processed folders
+    processed_folder = os.path.join(root_folder, 'processed')
+    vector_data_folder = os.path.join(processed_folder, 'vector_data')
+    raster_data_folder = os.path.join(processed_folder, 'raster_data')
+    other_data_folder = os.path.join(processed_folder, 'other_data')
+    empty_data_folder = os.path.join(processed_folder, 'empty_data')
+
+    # Ensure directories exist
+    os.makedirs(processed_folder, exist_ok=True)
+    os.makedirs(vector_data_folder, exist_ok=True)
+    os.makedirs(raster_data_folder, exist_ok=True)
+    os.makedirs(other_data_folder, exist_ok=True)
+    os.makedirs(empty_data_folder, exist_ok=True)
+
+    # Open the ingestion manifest and finish any moves an interrupted run left behind
+    manifest = None if args.no_manifest else open_manifest(os.path.join(processed_folder, 'manifest.sqlite'))
+    resumed = new_result()
+    if manifest is not None:
+        resume_interrupted_moves(manifest, resumed)
+
+    # Register the handlers in the order they run; files moved by one handler are not seen by the next
+    handlers = [
+        ('shapefile', ('.shp',), partial(process_shapefile, empty_files_folder=empty_data_folder, destination_folder=vector_data_folder), shapefile_associated_exts),
+        ('tiff', ('.tif', '.tiff'), partial(process_tiff, destination_folder=raster_data_folder, workers=args.workers, skip_nodata=args.skip_nodata, window_rows=args.window_rows, output_format=args.output_format, raster_output=args.raster_output, manifest=manifest), tiff_associated_exts),
+        ('gdb', ('.gdb.xml',), partial(process_gdb, destination_folder=vector_data_folder), gdb_associated_exts),
+        ('xyz', ('.xyz',), partial(process_xyz, empty_files_folder=empty_data_folder, destination_folder=vector_data_folder, workers=args.workers, output_format=args.output_format, manifest=manifest), xyz_associated_exts),
+        ('ers', ('.ers',), partial(process_ers, empty_files_folder=empty_data_folder, destination_folder=raster_data_folder, workers=args.workers, skip_nodata=args.skip_nodata, window_rows=args.window_rows, output_format=args.output_format, raster_output=args.raster_output, manifest=manifest), ers_associated_exts),
+        ('csv', ('.csv',), partial(process_csv, empty_files_folder=empty_data_folder, destination_folder=vector_data_folder), csv_associated_exts),
+        ('other', None, partial(process_other, destination_folder=other_data_folder), other_associated_exts),
+    ]
+
+    # Walk the data folder once and dispatch each group of files to its handler
+    groups = scan_folder(root_folder, processed_folder)
+    index_sidecars(groups)
+    results = dispatch(groups, handlers, manifest)
+    results['resumed'] = resumed
+
+    # Record the extent, CRS, row count and schema of the new and changed layers in the spatial catalog
+    if not args.no_catalog:
+        catalog = open_catalog(os.path.join(processed_folder, 'catalog.sqlite'))
+        index_folder(catalog, vector_data_folder)
+        index_folder(catalog, raster_data_folder)
+        catalog.close()
+
+    # Summary data
+    summary_data = {
+        "Total shapefiles processed": results['shapefile']['files'],
+        "Total TIFF files processed": results['tiff']['files'],
+        "Total GDB files processed": results['gdb']['files'],
+        "Total XYZ files processed": results['xyz']['files'],
+        "Total ERS files processed": results['ers']['files'],
+        "Total CSV files processed": results['csv']['files'],
+        "Total other files processed": results['other']['files'],
+        "Total size of moved files (kB)": f"{sum(result['size_kb'] for result in results.values()):.2f}",
+        "New folders created": f"{count_folders(processed_folder)}",
+        "Total files skipped (empty)": sum(result['skipped'] for result in results.values()),
+        "Total files failed (left in place)": sum(len(result['failed']) for result in results.values()),
+        "Total files unchanged since last run (skipped)": sum(result['unchanged'] for result in results.values()),
+        "Total duplicate files (skipped)": sum(result['duplicates'] for result in results.values()),
+        "Malformed XYZ lines (short, dropped)": results['xyz']['short_lines'],
+        "Malformed XYZ lines (non-numeric fields, kept)": results['xyz']['unparseable_lines'],
+        "Total wall time (s)": f"{time.perf_counter() - start:.1f}",
+        "Peak memory, main process (MB)": peak_rss_mb('self'),
+        "Peak memory, worker processes (MB)": peak_rss_mb('children'),
+    }
+
+    # Where the time went, handler by handler
+    metrics = {name: result['metrics'] for name, result in results.items() if 'metrics' in result}
+    for name, handler_metrics in metrics.items():
+        summary_data[f"{name} handler"] = (f"{handler_metrics['wall_s']:.1f} s, {handler_metrics['files_per_s'] or 0:.2f} files/s, "
+                                           f"{handler_metrics['mb_per_s'] or 0:.2f} MB/s")
+
+    # Write the summary file
+    summary_file_path = os.path.join(processed_folder, 'summary.txt')
+    with open(summary_file_path, 'w') as summary_file:
+        for label, value in summary_data.items():
+            summary_file.write(f"{label}: {value}\n")
+
+    print(f"Summary written to {summary_file_path}")
+
+    # Write the same summary, plus the per-handler metrics, in a machine-readable form
+    summary_json_path = os.path.join(processed_folder, 'summary.json')
+    with open(summary_json_path, 'w') as summary_json_file:
+        json.dump({'summary': summary_data, 'handlers': metrics}, summary_json_file, indent=2)
+
+    print(f"Metrics written to {summary_json_path}")
+    return results
+
+def main():
+    organize('../data', parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from utils import move_files
+from sidecars import find_sidecars
+
+# Statuses that mean a source file needs no further work while it is unchanged
+FINISHED_STATUSES = ('done', 'seen', 'duplicate')
+
+def open_manifest(manifest_path):
+    """
+    Open (or create) the persistent ingestion manifest, a SQLite database with one row per source file.
+
+    Columns:
+    source_path: Path of the source file in the data folder.
+    size, mtime, content_hash: Identity of the source when it was last seen (BLAKE2b of the content).
+    handler: Name of the handler that processed it.
+    status: 'pending' (handed to a handler), 'converted' (output written, moves not finished),
+            'done' (moved), 'seen' (processed but left in place), 'failed' or 'duplicate'.
+    target_folder, associated_exts: Where the file and its companions are being moved, so interrupted moves can resume.
+    outputs: JSON list of the files written or moved for this source.
+    duplicate_of: Source path of the byte-identical file processed earlier.
+    """
+    conn = sqlite3.connect(manifest_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            source_path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            handler TEXT,
+            status TEXT,
+            target_folder TEXT,
+            associated_exts TEXT,
+            outputs TEXT,
+            duplicate_of TEXT,
+            updated_at REAL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)")
+    conn.commit()
+    return conn
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the BLAKE2b hex digest of a file's content, read in chunks."""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def dataset_hash(file_path, suffixes=None, associated_exts=None):
+    """
+    Return the BLAKE2b hex digest of a source file together with the companion files moved with it.
+
+    The companions are found the way move_files finds them, from the source's base name (the path without
+    its registered suffix) and the handler's associated_exts. A source without companions hashes as its own
+    content, so its hash matches the one hash_file gives.
+    """
+    base_name = next((file_path[:-len(suffix)] for suffix in suffixes or () if file_path.lower().endswith(suffix)),
+                     os.path.splitext(file_path)[0])
+    companions = [path for path in find_sidecars(base_name, associated_exts or [])
+                  if os.path.isfile(path) and os.path.normpath(path) != os.path.normpath(file_path)]
+    content_hash = hash_file(file_path)
+    if not companions:
+        return content_hash
+
+    digest = hashlib.blake2b(content_hash.encode())
+    for path in companions:
+        digest.update(f"{path[len(base_name):]}:{hash_file(path)}".encode())
+    return digest.hexdigest()
+
+def update_entry(conn, source_path, **fields):
+    """Insert or update a manifest row and commit it straight away, so an interrupted run can resume from it."""
+    fields['updated_at'] = time.time()
+    columns = ', '.join(fields)
+    placeholders = ', '.join('?' for _ in fields)
+    updates = ', '.join(f"{column} = excluded.{column}" for column in fields)
+    conn.execute(f"INSERT INTO files (source_path, {columns}) VALUES (?, {placeholders}) "
+                 f"ON CONFLICT (source_path) DO UPDATE SET {updates}",
+                 (os.path.normpath(source_path), *fields.values()))
+    conn.commit()
+
+def get_entry(conn, source_path):
+    """Return a source file's manifest row as a dict, or None if it has never been seen."""
+    cursor = conn.execute("SELECT * FROM files WHERE source_path = ?", (os.path.normpath(source_path),))
+    row = cursor.fetchone()
+    return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+def filter_files(conn, files, handler, result, suffixes=None, associated_exts=None):
+    """
+    Drop the files that need no work from a handler's batch and register the rest as pending.
+
+    A file is dropped if it is unchanged (same size and mtime) since this handler finished with it,
+    or if it and its companion files are byte-identical to another source already in the manifest
+    (see dataset_hash). Empty files are never treated as duplicates. Only the files that still need
+    work are hashed.
+
+    Args:
+    conn (sqlite3.Connection): The open manifest.
+    files (list of str): The handler's batch.
+    handler (str): Name of the handler.
+    result (dict): The handler's result dict; its 'unchanged' and 'duplicates' counters are updated.
+    suffixes (tuple of str): The suffixes the handler is registered for, stripped to find each file's base name.
+    associated_exts (list of str): Extensions of the companion files the handler moves with each file.
+
+    Returns:
+    list of str: The files the handler still has to process. The dropped files are the rest of the batch.
+    """
+    remaining = []
+    for file_path in files:
+        stat = os.stat(file_path)
+        entry = get_entry(conn, file_path)
+        unchanged = entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+        # Files left in place by one handler are passed on to the next, so "finished" is per handler
+        if unchanged and entry['status'] in FINISHED_STATUSES and entry['handler'] == handler:
+            result['unchanged'] += 1
+            continue
+
+        # Companions can change without touching the file itself, so the hash is always recomputed here
+        content_hash = dataset_hash(file_path, suffixes, associated_exts)
+
+        # Empty files all hash alike but are not copies of each other; their handler deals with them
+        original = None if stat.st_size == 0 else conn.execute(
+            "SELECT source_path FROM files WHERE content_hash = ? AND source_path != ? "
+            "AND status IN ('pending', 'converted', 'done', 'seen') LIMIT 1",
+            (content_hash, os.path.normpath(file_path))).fetchone()
+        if original:
+            print(f"{file_path} and its companion files are identical to {original[0]}; skipping duplicate.")
+            update_entry(conn, file_path, size=stat.st_size, mtime=stat.st_mtime, content_hash=content_hash,
+                         handler=handler, status='duplicate', duplicate_of=original[0])
+            result['duplicates'] += 1
+            continue
+
+        # A file whose conversion finished before an interruption keeps its 'converted' status
+        status = 'converted' if unchanged and entry['status'] == 'converted' else 'pending'
+        update_entry(conn, file_path, size=stat.st_size, mtime=stat.st_mtime, content_hash=content_hash,
+                     handler=handler, status=status, duplicate_of=None)
+        remaining.append(file_path)
+
+    return remaining
+
+def converted_outputs(conn, source_path):
+    """Return the outputs of a conversion that finished in an earlier run, or None if it has to be (re)done."""
+    entry = get_entry(conn, source_path) if conn is not None else None
+    if entry is None or entry['status'] != 'converted':
+        return None
+    outputs = json.loads(entry['outputs'] or '[]')
+    return outputs if all(os.path.exists(path) for path in outputs) else None
+
+def is_converted(conn, source_path):
+    """Check whether a source's conversion already finished in an earlier run and its outputs still exist."""
+    return converted_outputs(conn, source_path) is not None
+
+def mark_converted(conn, source_path, outputs, target_folder, associated_exts):
+    """Record that a source's conversion finished, along with the moves still to be done."""
+    if conn is not None:
+        update_entry(conn, source_path, status='converted', outputs=json.dumps(outputs),
+                     target_folder=target_folder, associated_exts=json.dumps(associated_exts))
+
+def moved_outputs(result, source_path):
+    """Return the destinations move_files recorded for a source (the GDB handler moves by base name instead)."""
+    outputs = result['outputs']
+    return outputs.get(source_path) or outputs.get(os.path.splitext(source_path)[0], [])
+
+def finish_files(conn, files, result):
+    """Record the final status and output paths of a handler's batch once the handler returns."""
+    moved = {os.path.normpath(path) for path in result['moved']}
+    failed = {os.path.normpath(path) for path in result['failed']}
+    for file_path in files:
+        source_path = os.path.normpath(file_path)
+        entry = get_entry(conn, source_path) or {}
+        outputs = json.loads(entry.get('outputs') or '[]') + moved_outputs(result, source_path)
+        if source_path in failed:
+            status = 'failed'
+        elif source_path in moved:
+            status = 'done'
+        else:
+            status = 'seen'
+        update_entry(conn, source_path, status=status, outputs=json.dumps(list(dict.fromkeys(outputs))))
+
+def resume_interrupted_moves(conn, result):
+    """
+    Finish the moves of sources whose conversion completed but whose run was interrupted while moving.
+
+    Only sources that are already gone from the data folder are handled here; sources still in place
+    go through their handler again, which skips the conversion (see is_converted).
+    """
+    rows = conn.execute("SELECT source_path, target_folder, associated_exts FROM files WHERE status = 'converted'").fetchall()
+    for source_path, target_folder, associated_exts in rows:
+        if os.path.exists(source_path):
+            continue
+        print(f"Resuming interrupted moves for {source_path}")
+        move_files(source_path, json.loads(associated_exts), target_folder, result)
+        entry = get_entry(conn, source_path)
+        outputs = json.loads(entry['outputs'] or '[]') + moved_outputs(result, source_path)
+        update_entry(conn, source_path, status='done', outputs=json.dumps(list(dict.fromkeys(outputs))))
@@ -0,0 +1,66 @@
+import os
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from osgeo import ogr
+
+def file_key(file_path):
+    """Return a cache key that changes whenever the file is replaced or modified."""
+    stat = os.stat(file_path)
+    return os.path.normpath(file_path), stat.st_size, stat.st_mtime_ns
+
+def vector_info(vector_path):
+    """
+    Read a vector file's CRS and feature count from its headers, without loading any features.
+
+    For shapefiles the CRS comes from the .prj and the count from the .shx header.
+
+    Returns:
+    dict: 'crs' ("AUTHORITY:CODE" if it can be identified, otherwise the WKT; None if there is no CRS)
+          and 'features' (-1 if the driver cannot count without a full scan).
+          None if OGR cannot open the file.
+    """
+    return _vector_info(file_key(vector_path))
+
+@lru_cache(maxsize=None)
+def _vector_info(key):
+    dataset = ogr.Open(key[0])
+    if dataset is None or dataset.GetLayerCount() == 0:
+        return None
+
+    layer = dataset.GetLayer(0)
+    info = {'crs': None, 'features': layer.GetFeatureCount(force=0)}
+
+    spatial_ref = layer.GetSpatialRef()
+    if spatial_ref is not None:
+        try:
+            spatial_ref.AutoIdentifyEPSG()
+        except RuntimeError:
+            pass  # Not an EPSG CRS; the WKT is used instead
+        authority = spatial_ref.GetAuthorityName(None)
+        code = spatial_ref.GetAuthorityCode(None)
+        info['crs'] = f"{authority}:{code}" if authority and code else spatial_ref.ExportToWkt()
+
+    return info
+
+def gdb_xml_crs(xml_file):
+    """
+    Extract the CRS (EPSG code) from a .gdb.xml file in one streaming pass.
+
+    Parsing stops at the first projection element, so the rest of the file is never read.
+
+    Returns:
+    str: "EPSG_<code>", or "CRS_unknown" if there is no projection, no EPSG code or the XML cannot be parsed.
+    """
+    return _gdb_xml_crs(file_key(xml_file))
+
+@lru_cache(maxsize=None)
+def _gdb_xml_crs(key):
+    try:
+        for _, elem in ET.iterparse(key[0], events=('start',)):
+            # Match the local name, whatever namespace the projection element is in
+            if elem.tag.rsplit('}', 1)[-1] == 'projection':
+                epsg_code = elem.attrib.get('wellknown_epsg')
+                return f"EPSG_{epsg_code}" if epsg_code else "CRS_unknown"
+    except ET.ParseError as e:
+        print(f"Error parsing {key[0]}: {e}")
+    return "CRS_unknown"
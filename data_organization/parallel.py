@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import record_file_time
+
+def run_job(func, args):
+    """
+    Run a single conversion job, returning (return value, None, seconds) on success
+    or (None, error message, seconds) on failure.
+    """
+    start = time.perf_counter()
+    try:
+        return func(*args), None, time.perf_counter() - start
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def run_jobs(jobs, workers=1):
+    """
+    Run per-file conversion jobs, optionally fanned out to a process pool.
+
+    A failing job never stops the batch: its error is printed and returned in its slot instead.
+
+    Args:
+    jobs (list of tuples): (func, args) pairs. func must be a module-level function so it can be pickled.
+                           A None entry stands for a job with nothing left to do and yields (None, None).
+    workers (int): Number of worker processes. 1 runs the jobs in the current process.
+
+    Returns:
+    list of tuples: One (return value, error) pair per job, in submission order.
+                    error is None on success, or the error message on failure.
+    """
+    pending = [job for job in jobs if job is not None]
+    if workers <= 1 or len(pending) <= 1:
+        results = [run_job(func, args) for func, args in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = [executor.submit(run_job, func, args) for func, args in pending]
+
+            results = []
+            for future in futures:
+                # A worker that dies outright (e.g. a crash inside GDAL) surfaces here rather than in run_job
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append((None, f"{type(e).__name__}: {e}", 0.0))
+
+    for (func, args), (_, error, seconds) in zip(pending, results):
+        record_file_time(args[0], func.__name__, seconds)
+        if error:
+            print(f"Failed {func.__name__} on {args[0]}: {error}")
+
+    results = iter(results)
+    return [(None, None) if job is None else next(results)[:2] for job in jobs]
@@ -1,6 +1,7 @@
-import os
 import csv
-from utils import move_files
+from utils import move_files, new_result
+
+csv_associated_exts = ['.csv']
 
 def is_csv_empty(file_path):
     with open(file_path, 'r') as f:
@@ -8,23 +9,18 @@ def is_csv_empty(file_path):
         return not any(reader)  # Returns True if there are no rows
     
 
-def process_csv(folder, processed_folder, empty_files_folder, destination_folder, total_files, total_skipped, total_size_kb, new_folders):
-    for root, _, files in os.walk(folder):
-        if processed_folder in root:
+def process_csv(files, empty_files_folder, destination_folder):
+    result = new_result()
+    for csv_path in files:
+        result['files'] += 1
+
+        if is_csv_empty(csv_path):
+            result['skipped'] += 1
+            move_files(csv_path, csv_associated_exts, empty_files_folder, result)
             continue
-        for file in files:
-            if file.lower().endswith('.csv'):
-                total_files += 1
-                csv_path = os.path.join(root, file)
-                csv_size_kb = os.path.getsize(csv_path) / 1024  # KB
-                total_size_kb += csv_size_kb
-                
-                if is_csv_empty(csv_path):
-                    total_skipped += 1
-                    total_size_kb = move_files(csv_path, ['.csv'], empty_files_folder, total_size_kb)
 
-                total_size_kb = move_files(csv_path, ['.csv'], destination_folder, total_size_kb, new_folders)
-                    
+        move_files(csv_path, csv_associated_exts, destination_folder, result)
+
     # Return the updated totals
-    return total_files, total_skipped, total_size_kb, new_folders
+    return result
                 
\ No newline at end of file
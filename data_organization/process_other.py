@@ -1,17 +1,18 @@
 import os
-from utils import move_files
+from utils import move_files, new_result
 
-def process_other(folder, processed_folder, destination_folder, total_files, total_size_kb):
-    for root, _, files in os.walk(folder):
-        if processed_folder in root:
+other_associated_exts = ['.pdf', '.xslt', '.GeosoftMeta']  # TODO: Add to this list if other files remain
+
+def process_other(files, destination_folder):
+    result = new_result()
+    for file_path in files:
+        # Skip files already moved as companions of an earlier file in this batch
+        if not os.path.exists(file_path):
             continue
-        for file in files:
-            total_files += 1
-            file_path = os.path.join(root, file)
-            file_size_kb = os.path.getsize(file_path) / 1024  # KB
-            total_size_kb += file_size_kb
-        
-            total_size_kb = move_files(file_path, ['.pdf', '.xslt', '.GeosoftMeta'], destination_folder, total_size_kb) # TODO: Add to this list if other files remain
-                    
+
+        result['files'] += 1
+
+        move_files(file_path, other_associated_exts, destination_folder, result)
+
     # Return the updated totals
-    return total_files, total_size_kb
\ No newline at end of file
+    return result
\ No newline at end of file
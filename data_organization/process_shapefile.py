@@ -1,42 +1,38 @@
 import os
-import geopandas as gpd
-from utils import move_files
+from utils import move_files, new_result
+from metadata import vector_info
 
-def get_shapefile_crs(shapefile):
-    crs = shapefile.crs.to_string().replace(":", "_").replace("/", "_") if shapefile.crs else 'CRS_unknown'
+shapefile_associated_exts = ['.shp', '.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml']
+
+def get_shapefile_crs(info):
+    crs = info['crs'].replace(":", "_").replace("/", "_") if info['crs'] else 'CRS_unknown'
     return crs
 
-def process_shapefile(folder, processed_folder, empty_files_folder, destination_folder, total_files, total_skipped, total_size_kb):
-    for root, _, files in os.walk(folder):
-        if processed_folder in root:
+def process_shapefile(files, empty_files_folder, destination_folder):
+    result = new_result()
+    for shapefile_path in files:
+        result['files'] += 1
+
+        # Only the headers are read: the CRS from the .prj and the feature count from the .shx
+        info = vector_info(shapefile_path)
+        if info is None:
+            print(f"Error reading {shapefile_path}")
+            continue
+
+        if info['features'] == 0:
+            print("EMPTY FILE; skipping!")
+            result['skipped'] += 1
+            move_files(shapefile_path, shapefile_associated_exts, empty_files_folder, result)
             continue
-        for file in files:
-            if file.lower().endswith('.shp'):
-                total_files += 1
-                shapefile_path = os.path.join(root, file)
-                shapefile_size_kb = os.path.getsize(shapefile_path) / 1024  # KB
-                total_size_kb += shapefile_size_kb
-
-                try:
-                    gdf = gpd.read_file(shapefile_path)
-                except Exception as e:
-                    print(f"Error reading {shapefile_path}: {e}")
-                    continue
-
-                if gdf.empty:
-                    print("EMPTY FILE; skipping!")
-                    total_skipped += 1
-                    total_size_kb = move_files(shapefile_path, ['.shp', '.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml'], empty_files_folder, total_size_kb)
-                    continue
-
-                crs = get_shapefile_crs(gdf)
-                output_folder = os.path.join(destination_folder, crs)
-                os.makedirs(output_folder, exist_ok=True)
-
-                # csv_file_path = os.path.join(output_folder, f"{os.path.splitext(file)[0]}.csv")
-                # gdf.to_csv(csv_file_path, index=False)
-
-                total_size_kb = move_files(shapefile_path, ['.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml'], output_folder, total_size_kb)
+
+        crs = get_shapefile_crs(info)
+        output_folder = os.path.join(destination_folder, crs)
+        os.makedirs(output_folder, exist_ok=True)
+
+        # csv_file_path = os.path.join(output_folder, f"{os.path.splitext(file)[0]}.csv")
+        # gdf.to_csv(csv_file_path, index=False)
+
+        move_files(shapefile_path, shapefile_associated_exts, output_folder, result)
 
     # Return the updated totals
-    return total_files, total_skipped, total_size_kb
\ No newline at end of file
+    return result
\ No newline at end of file
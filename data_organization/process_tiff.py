@@ -1,52 +1,52 @@
 import os
-import csv
-from utils import move_files
-from osgeo import gdal
+from utils import move_files, new_result
+from parallel import run_jobs
+from raster_io import open_raster, raster_crs, raster_output_path, export_raster
+from manifest import converted_outputs, mark_converted
 
-def get_tiff_crs(tiff_path):
-    """Retrieve the CRS from a TIFF file using GDAL."""
-    dataset = gdal.Open(tiff_path)
-    if not dataset:
-        print(f"Unable to open {tiff_path}")
-        return None
-    proj = dataset.GetProjection()
-    spatial_ref = gdal.osr.SpatialReference(wkt=proj)
-    authority = spatial_ref.GetAttrValue("AUTHORITY", 0)
-    code = spatial_ref.GetAttrValue("AUTHORITY", 1)
-    return f"{authority}_{code}" if authority and code else "CRS_unknown"
+# Companion files moved along with each TIFF
+tiff_associated_exts = ['.tiff', '.tiff.aux.xml', '.tif', '.tif.xml', '.GRD', '.GRD.gi', '.GRD.xml', '.map', '.map.xml']
 
-def tiff_to_csv(tiff_path, output_csv_path):
-    dataset = gdal.Open(tiff_path)
-    band = dataset.GetRasterBand(1)
-    raster_data = band.ReadAsArray()
-    geotransform = dataset.GetGeoTransform()
-    with open(output_csv_path, mode='w', newline='') as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(['Longitude', 'Latitude', 'Value'])
-        for row in range(raster_data.shape[0]):
-            for col in range(raster_data.shape[1]):
-                x = geotransform[0] + col * geotransform[1] + row * geotransform[2]
-                y = geotransform[3] + col * geotransform[4] + row * geotransform[5]
-                csv_writer.writerow([x, y, raster_data[row, col]])
+def tiff_to_csv(tiff_path, destination_folder, skip_nodata=False, window_rows=None, output_format='csv', raster_output='table'):
+    """
+    Convert a TIFF into a folder named after its CRS, opening the file only once for the CRS lookup and the conversion.
 
-def process_tiff(folder, processed_folder, destination_folder, total_files, total_size_kb):
-    for root, _, files in os.walk(folder):
-        if processed_folder in root:
-            continue
-        for file in files:
-            if file.lower().endswith('.tiff') or file.lower().endswith('.tif'):
-                total_files += 1
-                tiff_path = os.path.join(root, file)
-                tiff_size_kb = os.path.getsize(tiff_path) / 1024  # KB
-                total_size_kb += tiff_size_kb
+    Returns:
+    str: Path of the converted file. Errors are raised so that run_jobs can record the failure.
+    """
+    with open_raster(tiff_path) as dataset:
+        if not dataset:
+            raise IOError(f"Unable to open {tiff_path}")
+        output_folder = os.path.join(destination_folder, raster_crs(dataset))
+        os.makedirs(output_folder, exist_ok=True)
+        # Rasters are either flattened into a point table or kept as a Cloud-Optimized GeoTIFF
+        export_format = 'cog' if raster_output == 'cog' else output_format
+        output_path = raster_output_path(output_folder, tiff_path, export_format)
+        export_raster(dataset, output_path, export_format, skip_nodata, window_rows)
+    return output_path
+
+def process_tiff(files, destination_folder, workers=1, skip_nodata=False, window_rows=None, output_format='csv', raster_output='table', manifest=None):
+    result = new_result()
+    conversions = []
+    for tiff_path in files:
+        result['files'] += 1
 
-                crs = get_tiff_crs(tiff_path)
-                crs_folder = crs if crs else "CRS_unknown"
-                output_folder = os.path.join(destination_folder, crs_folder)
-                os.makedirs(output_folder, exist_ok=True)
-                csv_file_path = os.path.join(output_folder, f"{os.path.splitext(file)[0]}.csv")
-                tiff_to_csv(tiff_path, csv_file_path)
-                total_size_kb = move_files(tiff_path, ['.tiff', '.tiff.aux.xml', '.tif', '.tif.xml', '.GRD', '.GRD.gi', '.GRD.xml', '.map', '.map.xml'], output_folder, total_size_kb)
+        # A conversion finished by an interrupted run is not repeated
+        previous_outputs = converted_outputs(manifest, tiff_path)
+        job = None if previous_outputs else (tiff_to_csv, (tiff_path, destination_folder, skip_nodata, window_rows, output_format, raster_output))
+        conversions.append((tiff_path, previous_outputs, job))
+
+    # Convert in parallel, then move in the original order so the results are deterministic
+    outcomes = run_jobs([job for *_, job in conversions], workers)
+    for (tiff_path, previous_outputs, _), (output_file_path, error) in zip(conversions, outcomes):
+        if error:
+            result['failed'].append(tiff_path)
+            continue
+        if previous_outputs:
+            output_file_path = previous_outputs[0]
+        output_folder = os.path.dirname(output_file_path)
+        mark_converted(manifest, tiff_path, [output_file_path], output_folder, tiff_associated_exts)
+        move_files(tiff_path, tiff_associated_exts, output_folder, result)
 
     # Return updated totals
-    return total_files, total_size_kb
+    return result
@@ -1,6 +1,11 @@
 import os
-import csv
-from utils import move_files
+from utils import move_files, new_result
+from parallel import run_jobs
+from table_writer import open_table_writer, output_extension
+from manifest import is_converted, mark_converted
+import pandas as pd
+
+xyz_associated_exts = ['.xyz']
 
 # Magnetic data headers (from metadata)
 magnetic_headers = [
@@ -20,29 +25,102 @@ radiometric_headers = [
     'Air temperature (°C)', 'Air pressure (mmHg)'
 ]
 
-# Convert XYZ to CSV with appropriate headers (based on metadata)
+# Column types for the header schemas. Codes, counters and dates are integers; everything else is float64.
+integer_columns = {
+    'Flight line number': 'int32', 'Fiducial number': 'int64', 'Julian day': 'int16', 'Year': 'int16',
+    'Geology (coded)': 'int16', 'Quality flag': 'int16'
+}
+
+def schema_dtypes(headers):
+    """Map each header of a schema to the dtype it is parsed into."""
+    return {header: integer_columns.get(header, 'float64') for header in headers}
+
+def new_parse_stats():
+    """Counters reported for each parsed XYZ file."""
+    return {'rows': 0, 'short_lines': 0, 'unparseable_lines': 0}
+
+def type_chunk(chunk, dtypes, stats):
+    """
+    Convert a chunk of raw XYZ fields to the schema dtypes, updating the parse counters.
+
+    Lines with fewer fields than headers are dropped (as before) but counted as short lines.
+    Lines with non-numeric fields (or fractional values in integer columns) are kept, with those fields
+    set to missing, and counted as unparseable.
+    """
+    headers = list(dtypes)
+
+    # With NA detection off, the missing trailing fields of a short line come back as empty strings
+    last = chunk[headers[-1]]
+    short = last.isna() | (last.astype(str) == '') if not pd.api.types.is_numeric_dtype(last) else pd.Series(False, index=chunk.index)
+    chunk = chunk[~short]
+
+    unparseable = pd.Series(False, index=chunk.index)
+    columns = {}
+    for header, dtype in dtypes.items():
+        column = chunk[header]
+        if not pd.api.types.is_numeric_dtype(column):
+            # Only columns holding a stray token need the slower coercion pass
+            numeric = pd.to_numeric(column, errors='coerce')
+            unparseable |= numeric.isna()
+            column = numeric
+        if dtype == 'float64':
+            column = column.astype('float64')
+        else:
+            # Nullable integers keep every chunk on the same schema even where a value is missing;
+            # a fractional value in an integer column is treated as unparseable
+            fractional = column.notna() & (column % 1 != 0)
+            unparseable |= fractional
+            column = column.mask(fractional).astype(dtype.capitalize())
+        columns[header] = column
+
+    stats['rows'] += len(chunk)
+    stats['short_lines'] += int(short.sum())
+    stats['unparseable_lines'] += int(unparseable.sum())
+    return pd.DataFrame(columns)
+
+def parse_xyz_chunks(xyz_path, headers, chunk_rows=500_000, stats=None):
+    """
+    Parse a whitespace-delimited XYZ file into typed DataFrame chunks with pandas' C tokenizer.
+
+    Fields beyond the known headers are ignored and blank lines are skipped, as in the original line-by-line reader.
+
+    Args:
+    xyz_path (str): Path to the XYZ file.
+    headers (list): The header schema (magnetic_headers or radiometric_headers).
+    chunk_rows (int): Number of lines parsed per chunk; bounds the memory used.
+    stats (dict): Optional counters (see new_parse_stats), updated as chunks are parsed.
+
+    Yields:
+    pandas.DataFrame: Typed chunks with the schema's columns.
+    """
+    stats = new_parse_stats() if stats is None else stats
+    dtypes = schema_dtypes(headers)
+    reader = pd.read_csv(xyz_path, sep=r'\s+', header=None, names=headers, usecols=range(len(headers)),
+                         chunksize=chunk_rows, engine='c', keep_default_na=False, na_values=[], skip_blank_lines=True)
+    for chunk in reader:
+        yield type_chunk(chunk, dtypes, stats)
+
+def report_parse_stats(xyz_path, stats):
+    """Print the malformed line counts for a parsed XYZ file."""
+    if stats['short_lines'] or stats['unparseable_lines']:
+        print(f"{xyz_path}: {stats['short_lines']} short lines dropped, "
+              f"{stats['unparseable_lines']} lines with non-numeric fields kept as missing values.")
+
+# Convert XYZ to a CSV, Parquet or Feather table with appropriate headers (based on metadata)
+# Errors are raised so that run_jobs can record the failure
+def xyz_to_table(xyz_path, output_path, headers, output_format='csv'):
+    stats = new_parse_stats()
+    with open_table_writer(output_path, output_format, headers) as write:
+        # Stream the typed chunks to the output
+        for chunk in parse_xyz_chunks(xyz_path, headers, stats=stats):
+            write({column: chunk[column].array for column in headers})
+
+    report_parse_stats(xyz_path, stats)
+    print(f"XYZ file {xyz_path} converted to {output_path}.")
+    return stats
+
 def xyz_to_csv(xyz_path, output_csv_path, headers):
-    try:
-        with open(xyz_path, 'r') as xyz_file, open(output_csv_path, 'w', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file)
-            
-            # Write headers to CSV
-            csv_writer.writerow(headers)
-
-            # Write the XYZ data to CSV
-            for line in xyz_file:
-                # Strip any extra whitespace and split the line on whitespace (handling multiple spaces)
-                row = line.strip().split()
-
-                # Ensure valid rows (skip empty lines)
-                if len(row) >= len(headers):
-                    # Write row data (matching the number of headers)
-                    csv_writer.writerow(row[:len(headers)])
-
-        print(f"XYZ file {xyz_path} converted to {output_csv_path}.")
-    
-    except Exception as e:
-        print(f"Failed to convert {xyz_path} to CSV: {e}")
+    return xyz_to_table(xyz_path, output_csv_path, headers, 'csv')
 
 # Check if file is empty
 def is_xyz_file_empty(xyz_file):
@@ -58,48 +136,57 @@ def is_xyz_file_empty(xyz_file):
     return True  # File is empty if no non-empty lines are found
 
 # Process XYZ files
-def process_xyz(folder, processed_folder, empty_files_folder, destination_folder, total_files, total_skipped, total_size_kb):
-    for root, _, files in os.walk(folder):
-        if processed_folder in root:
+def process_xyz(files, empty_files_folder, destination_folder, workers=1, output_format='csv', manifest=None):
+    result = new_result()
+    result.update(short_lines=0, unparseable_lines=0)
+    conversions = []
+    for xyz_path in files:
+        file = os.path.basename(xyz_path)
+        result['files'] += 1
+
+        if is_xyz_file_empty(xyz_path):
+            result['skipped'] += 1
+            move_files(xyz_path, xyz_associated_exts, empty_files_folder, result)
             continue
 
-        for file in files:
-            if file.lower().endswith('.xyz'):
-                total_files += 1
-                xyz_path = os.path.join(root, file)
-                xyz_size_kb = os.path.getsize(xyz_path) / 1024  # KB
-                total_size_kb += xyz_size_kb
-                
-                if is_xyz_file_empty(xyz_path):
-                    total_skipped += 1
-                    total_size_kb = move_files(xyz_path, ['.xyz'], empty_files_folder, total_size_kb)
-                    continue
-                
-                # Determine which headers to use based on the filename
-                if 'mag' in file.lower():
-                    headers = magnetic_headers
-                elif 'rad' in file.lower():
-                    headers = radiometric_headers
-                else:
-                    print(f"Unknown file type for {file}, skipping.")
-                    continue  # Skip if the file doesn't match known types
-
-                # CRS for the XYZ file (NAD27 assumed from metadata)
-                crs_folder = "EPSG_4267"
-
-                # Create folder based on the extracted CRS
-                output_folder = os.path.join(destination_folder, crs_folder)
-                os.makedirs(output_folder, exist_ok=True)
-
-                # Convert XYZ to CSV and move the original XYZ and CSV files
-                csv_file_path = os.path.join(output_folder, f"{os.path.splitext(file)[0]}.csv")
-                xyz_to_csv(xyz_path, csv_file_path, headers)
-                total_size_kb = move_files(xyz_path, ['.xyz'], output_folder, total_size_kb)
-                
-                # Split file name to account for other files associated with XYZ files (JPG and TXT)
-                xyz_path_without_data_suffix = xyz_path.rsplit('_', 1)[0]
-                total_size_kb = move_files(xyz_path_without_data_suffix, ['.jpg'], output_folder, total_size_kb)
-                total_size_kb = move_files(f"{xyz_path_without_data_suffix}_meta", ['.txt'], output_folder, total_size_kb)
-                
+        # Determine which headers to use based on the filename
+        if 'mag' in file.lower():
+            headers = magnetic_headers
+        elif 'rad' in file.lower():
+            headers = radiometric_headers
+        else:
+            print(f"Unknown file type for {file}, skipping.")
+            continue  # Skip if the file doesn't match known types
+
+        # CRS for the XYZ file (NAD27 assumed from metadata)
+        crs_folder = "EPSG_4267"
+
+        # Create folder based on the extracted CRS
+        output_folder = os.path.join(destination_folder, crs_folder)
+        os.makedirs(output_folder, exist_ok=True)
+
+        # Convert XYZ to CSV and move the original XYZ and CSV files
+        output_file_path = os.path.join(output_folder, f"{os.path.splitext(file)[0]}{output_extension(output_format)}")
+        # A conversion finished by an interrupted run is not repeated
+        job = None if is_converted(manifest, xyz_path) else (xyz_to_table, (xyz_path, output_file_path, headers, output_format))
+        conversions.append((xyz_path, output_folder, output_file_path, job))
+
+    # Convert in parallel, then move in the original order so the results are deterministic
+    outcomes = run_jobs([job for *_, job in conversions], workers)
+    for (xyz_path, output_folder, output_file_path, _), (stats, error) in zip(conversions, outcomes):
+        if error:
+            result['failed'].append(xyz_path)
+            continue
+        if stats:
+            result['short_lines'] += stats['short_lines']
+            result['unparseable_lines'] += stats['unparseable_lines']
+        mark_converted(manifest, xyz_path, [output_file_path], output_folder, ['.xyz'])
+        move_files(xyz_path, xyz_associated_exts, output_folder, result)
+
+        # Split file name to account for other files associated with XYZ files (JPG and TXT)
+        xyz_path_without_data_suffix = xyz_path.rsplit('_', 1)[0]
+        move_files(xyz_path_without_data_suffix, ['.jpg'], output_folder, result)
+        move_files(f"{xyz_path_without_data_suffix}_meta", ['.txt'], output_folder, result)
+
     # Return updated totals
-    return total_files, total_skipped, total_size_kb
\ No newline at end of file
+    return result
\ No newline at end of file
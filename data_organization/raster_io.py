@@ -0,0 +1,276 @@
+import os
+import numpy as np
+from contextlib import contextmanager
+from osgeo import gdal, osr
+from table_writer import columnar_writer, output_extension
+
+# Number of pixels formatted and written per bulk write
+PIXELS_PER_WRITE = 1_000_000
+
+@contextmanager
+def open_raster(raster_path):
+    """
+    Open a raster once so the CRS lookup, the emptiness check and the conversion can share the handle.
+
+    Yields:
+    gdal.Dataset: The open dataset, or None if GDAL cannot open the file. The handle is released on exit.
+    """
+    dataset = gdal.Open(raster_path)
+    try:
+        yield dataset
+    finally:
+        dataset = None
+
+def raster_crs(dataset):
+    """Return the dataset's CRS as "AUTHORITY_CODE" (e.g. "EPSG_4326"), or "CRS_unknown" if it has none."""
+    proj = dataset.GetProjection()
+    if not proj:
+        return "CRS_unknown"
+    spatial_ref = osr.SpatialReference(wkt=proj)
+    authority = spatial_ref.GetAttrValue("AUTHORITY", 0)
+    code = spatial_ref.GetAttrValue("AUTHORITY", 1)
+    return f"{authority}_{code}" if authority and code else "CRS_unknown"
+
+def is_raster_empty(dataset):
+    """
+    Check whether a raster has no data, from its header alone (no pixels are read).
+
+    A raster is empty if it has no bands or no pixels, if one of its data files is missing or has
+    no bytes, or if statistics stored with it show that no pixel is valid.
+    """
+    if dataset.RasterCount == 0 or dataset.RasterXSize == 0 or dataset.RasterYSize == 0:
+        return True
+
+    # The header file is always listed first; the rest hold the pixels (e.g. the extensionless ERS data file)
+    for data_file in (dataset.GetFileList() or [])[1:]:
+        if data_file.lower().endswith('.aux.xml'):
+            continue
+        if not os.path.exists(data_file) or os.path.getsize(data_file) == 0:
+            return True
+
+    # Statistics saved in the header or .aux.xml, if any; never computed here
+    valid_percent = dataset.GetRasterBand(1).GetMetadataItem('STATISTICS_VALID_PERCENT')
+    return valid_percent is not None and float(valid_percent) == 0
+
+def iter_raster_windows(band, window_size=None):
+    """
+    Read a raster band window by window instead of loading the whole band.
+
+    Windows are yielded in row-major order, so full-width windows give the pixels in the same order
+    as a whole-band read. Peak memory depends on the window size, not on the raster size.
+
+    Args:
+    band (gdal.Band): The raster band to read.
+    window_size (tuple): Optional (rows, cols) window. Defaults to the band's native GDAL block size.
+
+    Yields:
+    tuple: (row_offset, col_offset, numpy.ndarray) for each window.
+    """
+    if window_size is None:
+        block_cols, block_rows = band.GetBlockSize()
+        window_size = (block_rows, block_cols)
+    window_rows, window_cols = (max(1, size) for size in window_size)
+
+    for row_offset in range(0, band.YSize, window_rows):
+        n_rows = min(window_rows, band.YSize - row_offset)
+        for col_offset in range(0, band.XSize, window_cols):
+            n_cols = min(window_cols, band.XSize - col_offset)
+            yield row_offset, col_offset, band.ReadAsArray(col_offset, row_offset, n_cols, n_rows)
+
+def strip_rows(band, window_rows=None):
+    """
+    Pick the height of the full-width strips used to export a band.
+
+    Defaults to a whole number of native blocks holding roughly PIXELS_PER_WRITE pixels,
+    so each strip is read with aligned block I/O.
+    """
+    if window_rows:
+        return window_rows
+    block_rows = band.GetBlockSize()[1]
+    blocks = max(1, PIXELS_PER_WRITE // max(band.XSize * block_rows, 1))
+    return block_rows * blocks
+
+def format_floats(values):
+    """Format float64 values exactly as csv.writer does (repr)."""
+    return list(map(repr, values.tolist()))
+
+def format_values(values):
+    """
+    Format band values exactly as csv.writer does (str() of the numpy scalar).
+
+    Each distinct value is formatted once. Floats are deduplicated on their bit pattern
+    so that -0.0 and NaN payloads keep their own spelling.
+    """
+    flat = np.ascontiguousarray(values).ravel()
+    keys = flat.view(f"u{flat.itemsize}") if flat.dtype.kind == 'f' else flat
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    strings = np.array(flat[first_index].astype(str).tolist(), dtype=object)
+    return strings[inverse.ravel()].reshape(values.shape)
+
+def pixel_coordinates(geotransform, row_offset, n_rows, n_cols):
+    """
+    Compute the x/y coordinates of a block of pixels from a GDAL geotransform.
+
+    The arithmetic is done in the same order as the original per-pixel loop
+    (origin + col * pixel_width + row * rotation), so the coordinates are bit-for-bit identical.
+
+    Returns:
+    tuple of numpy.ndarray: x and y arrays of shape (n_rows, n_cols).
+    """
+    cols = np.arange(n_cols, dtype=np.float64)
+    rows = np.arange(row_offset, row_offset + n_rows, dtype=np.float64)[:, np.newaxis]
+    x = geotransform[0] + cols * geotransform[1] + rows * geotransform[2]
+    y = geotransform[3] + cols * geotransform[4] + rows * geotransform[5]
+    return x, y
+
+def nodata_mask(values, nodata):
+    """Return a boolean mask of the pixels equal to the band's NoData value (None if the band has none)."""
+    if nodata is None:
+        return None
+    if np.isnan(nodata):
+        return np.isnan(values)
+    return values == nodata
+
+def format_block(geotransform, row_offset, values, mask=None):
+    """
+    Format a block of pixel rows as Longitude,Latitude,Value CSV lines, byte-identical to csv.writer output.
+
+    Args:
+    geotransform (tuple): The dataset's GDAL geotransform.
+    row_offset (int): Raster row of the block's first row.
+    values (numpy.ndarray): 2D block of band values.
+    mask (numpy.ndarray): Optional boolean mask of pixels to leave out (e.g. NoData).
+
+    Returns:
+    str: The CSV text for the block.
+    """
+    n_rows, n_cols = values.shape
+    value_strings = format_values(values)
+
+    if geotransform[2] == 0 and geotransform[4] == 0:
+        # North-up raster: x only depends on the column and y only on the row, so each is formatted once.
+        # The zero rotation terms are still added so signed zeros come out exactly as in the per-pixel formula.
+        cols = np.arange(n_cols, dtype=np.float64)
+        rows = np.arange(row_offset, row_offset + n_rows, dtype=np.float64)
+        x_row = format_floats(geotransform[0] + cols * geotransform[1] + 0.0 * geotransform[2])
+        y_col = format_floats(geotransform[3] + 0.0 * geotransform[4] + rows * geotransform[5])
+        x_strings = np.array(x_row, dtype=object)
+        x_strings = np.broadcast_to(x_strings, (n_rows, n_cols))
+        y_strings = None
+    else:
+        x, y = pixel_coordinates(geotransform, row_offset, n_rows, n_cols)
+        x_strings = np.array(format_floats(x.ravel()), dtype=object).reshape(n_rows, n_cols)
+        y_strings = np.array(format_floats(y.ravel()), dtype=object).reshape(n_rows, n_cols)
+
+    chunks = []
+    for row in range(n_rows):
+        keep = slice(None) if mask is None else ~mask[row]
+        xs = x_strings[row][keep].tolist()
+        vs = value_strings[row][keep].tolist()
+        if not xs:
+            continue
+
+        # Interleave x and value strings and fill a per-row template in a single formatting call
+        fields = [None] * (2 * len(xs))
+        fields[0::2] = xs
+        fields[1::2] = vs
+        if y_strings is None:
+            template = f"%s,{y_col[row]},%s\r\n" * len(xs)
+        else:
+            template = ''.join(f"%s,{y},%s\r\n" for y in y_strings[row][keep].tolist())
+        chunks.append(template % tuple(fields))
+
+    return ''.join(chunks)
+
+def raster_to_csv(dataset, output_csv_path, skip_nodata=False, window_rows=None):
+    """
+    Export the first band of an open GDAL dataset as Longitude/Latitude/Value CSV rows.
+
+    The band is streamed in full-width strips (see strip_rows), so memory use is bounded by the strip size.
+
+    Args:
+    dataset (gdal.Dataset): The open raster dataset.
+    output_csv_path (str): Path of the CSV file to write.
+    skip_nodata (bool): If True, pixels equal to the band's NoData value are not written.
+                        The default writes every pixel, exactly as the original per-pixel export did.
+    window_rows (int): Optional number of raster rows read per strip.
+    """
+    band = dataset.GetRasterBand(1)
+    geotransform = dataset.GetGeoTransform()
+    nodata = band.GetNoDataValue() if skip_nodata else None
+    window_size = (strip_rows(band, window_rows), band.XSize)
+
+    with open(output_csv_path, mode='w', newline='') as csv_file:
+        csv_file.write("Longitude,Latitude,Value\r\n")
+        for row_offset, _, values in iter_raster_windows(band, window_size):
+            csv_file.write(format_block(geotransform, row_offset, values, nodata_mask(values, nodata)))
+
+def raster_to_columnar(dataset, output_path, output_format, skip_nodata=False, window_rows=None):
+    """
+    Export the first band of an open GDAL dataset as a typed Longitude/Latitude/Value Parquet or Feather file.
+
+    Coordinates are float64 and values keep the band's own dtype. Arguments are as for raster_to_csv.
+    """
+    band = dataset.GetRasterBand(1)
+    geotransform = dataset.GetGeoTransform()
+    nodata = band.GetNoDataValue() if skip_nodata else None
+    window_size = (strip_rows(band, window_rows), band.XSize)
+
+    with columnar_writer(output_path, output_format) as write:
+        for row_offset, _, values in iter_raster_windows(band, window_size):
+            x, y = pixel_coordinates(geotransform, row_offset, values.shape[0], values.shape[1])
+            mask = nodata_mask(values, nodata)
+            keep = slice(None) if mask is None else ~mask.ravel()
+            write({'Longitude': x.ravel()[keep], 'Latitude': y.ravel()[keep], 'Value': values.ravel()[keep]})
+
+def raster_to_table(dataset, output_path, output_format='csv', skip_nodata=False, window_rows=None):
+    """Export the first band of an open GDAL dataset in the requested output format ('csv', 'parquet' or 'feather')."""
+    if output_format == 'csv':
+        raster_to_csv(dataset, output_path, skip_nodata, window_rows)
+    else:
+        raster_to_columnar(dataset, output_path, output_format, skip_nodata, window_rows)
+
+def raster_to_cog(dataset, output_path):
+    """
+    Write an open GDAL dataset as a Cloud-Optimized GeoTIFF: tiled, DEFLATE-compressed, with internal overviews.
+
+    Uses GDAL's COG driver (GDAL 3.1+). Older GDAL builds get the same layout through the classic recipe:
+    overviews built on an in-memory copy, then a tiled GTiff written with COPY_SRC_OVERVIEWS.
+    """
+    if gdal.GetDriverByName('COG') is not None:
+        output = gdal.Translate(output_path, dataset, format='COG',
+                                creationOptions=['COMPRESS=DEFLATE', 'PREDICTOR=YES', 'BLOCKSIZE=512', 'OVERVIEWS=AUTO', 'BIGTIFF=IF_SAFER'])
+    else:
+        copy = gdal.Translate('', dataset, format='MEM')
+        factors = []
+        size = max(copy.RasterXSize, copy.RasterYSize)
+        while size // 2 ** (len(factors) + 1) >= 256:
+            factors.append(2 ** (len(factors) + 1))
+        if factors:
+            copy.BuildOverviews('AVERAGE', factors)
+        output = gdal.Translate(output_path, copy, format='GTiff',
+                                creationOptions=['TILED=YES', 'BLOCKXSIZE=512', 'BLOCKYSIZE=512', 'COMPRESS=DEFLATE',
+                                                 'COPY_SRC_OVERVIEWS=YES', 'BIGTIFF=IF_SAFER'])
+        copy = None
+
+    if output is None:
+        raise IOError(f"Unable to write {output_path}")
+    output = None  # Flush and close
+
+def raster_output_path(output_folder, raster_path, output_format):
+    """
+    Return the path a raster is converted to in its CRS folder.
+
+    COGs get a _cog suffix so they never clash with the source .tif, which is moved into the same folder.
+    """
+    name = os.path.splitext(os.path.basename(raster_path))[0]
+    if output_format == 'cog':
+        return os.path.join(output_folder, f"{name}_cog.tif")
+    return os.path.join(output_folder, f"{name}{output_extension(output_format)}")
+
+def export_raster(dataset, output_path, output_format='csv', skip_nodata=False, window_rows=None):
+    """Export an open GDAL dataset as a table ('csv', 'parquet' or 'feather') or keep it a raster ('cog')."""
+    if output_format == 'cog':
+        raster_to_cog(dataset, output_path)
+    else:
+        raster_to_table(dataset, output_path, output_format, skip_nodata, window_rows)
@@ -0,0 +1,97 @@
+import os
+import time
+from utils import new_result
+from instrumentation import file_times_mark, handler_metrics
+from manifest import filter_files, finish_files
+
+def scan_folder(folder, skip_folder):
+    """
+    Walk the folder once and group every file found by its lower-cased extension.
+
+    Args:
+    folder (str): The root folder to scan.
+    skip_folder (str): A folder inside the root (e.g. 'processed') that is not descended into.
+
+    Returns:
+    dict: Extension (e.g. '.shp', or '' for files without one) mapped to the file paths found, in walk order.
+    """
+    skip_folder = os.path.normpath(skip_folder)
+    groups = {}
+
+    for root, dirs, files in os.walk(folder):
+        # Prune the skipped folder so that its contents are never listed
+        dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) != skip_folder]
+
+        for file in files:
+            ext = os.path.splitext(file)[1].lower()
+            groups.setdefault(ext, []).append(os.path.join(root, file))
+
+    return groups
+
+def select_files(groups, suffixes, claimed):
+    """Return the scanned files ending in one of the suffixes (all files if suffixes is None) that are not yet claimed."""
+    if suffixes is None:
+        candidates = [path for paths in groups.values() for path in paths]
+    else:
+        # Compound suffixes like '.gdb.xml' are grouped under their last extension
+        candidates = []
+        for ext in dict.fromkeys('.' + suffix.rsplit('.', 1)[-1] for suffix in suffixes):
+            candidates.extend(path for path in groups.get(ext, []) if path.lower().endswith(tuple(suffixes)))
+
+    return [path for path in candidates if not is_claimed(path, claimed)]
+
+def is_claimed(path, claimed):
+    """Check whether a path, or a folder containing it, has already been moved by a handler."""
+    path = os.path.normpath(path)
+    while True:
+        if path in claimed:
+            return True
+        parent = os.path.dirname(path)
+        if parent == path or not parent:
+            return False
+        path = parent
+
+def dispatch(groups, handlers, manifest=None):
+    """
+    Run each registered handler, in order, on its group of scanned files.
+
+    Files (and folders) moved by one handler are not passed on to the handlers that follow,
+    which mirrors the behaviour of each handler walking the tree after the previous one finished.
+    With a manifest, files that need no work (unchanged since processed, or duplicates) are left out
+    of each batch, and every file's outcome is recorded once its handler returns.
+    Each result gets a 'metrics' entry with the batch's timings (see instrumentation.handler_metrics).
+
+    Args:
+    groups (dict): The extension groups returned by scan_folder.
+    handlers (list of tuples): (name, suffixes, handler, associated_exts) entries. A handler is called with the
+                               list of matching file paths and returns a result dict (see utils.new_result).
+                               suffixes=None registers a catch-all handler for every remaining file.
+                               associated_exts lists the companion files the handler moves with each file,
+                               which are hashed with it when looking for duplicates.
+    manifest (sqlite3.Connection): Optional ingestion manifest (see manifest.open_manifest).
+
+    Returns:
+    dict: Handler name mapped to the result dict it returned.
+    """
+    results = {}
+    claimed = set()
+
+    for name, suffixes, handler, associated_exts in handlers:
+        files = select_files(groups, suffixes, claimed)
+        start, mark = time.perf_counter(), file_times_mark()
+        if manifest is None:
+            result = handler(files)
+        else:
+            skipped = new_result()
+            remaining = filter_files(manifest, files, name, skipped, suffixes, associated_exts)
+            claimed.update(os.path.normpath(path) for path in set(files) - set(remaining))
+            files = remaining
+            result = handler(files)
+            result['unchanged'] += skipped['unchanged']
+            result['duplicates'] += skipped['duplicates']
+            finish_files(manifest, files, result)
+        claimed.update(os.path.normpath(path) for path in result['moved'] + result['failed'])
+        result['metrics'] = handler_metrics(result, time.perf_counter() - start, mark)
+        results[name] = result
+
+    return results
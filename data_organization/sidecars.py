@@ -0,0 +1,94 @@
+import os
+import shutil
+
+# Sidecar index built from the scan: (folder, base name) -> {suffix: path}. None until index_sidecars is called.
+_index = None
+
+# Device of each target folder, so same-filesystem moves can be done as plain renames
+_folder_devices = {}
+
+def _index_keys(path):
+    """Yield every (folder, base name) key a path can be a companion of, with the suffix it has under that key."""
+    folder, name = os.path.split(os.path.normpath(path))
+    yield (folder, name), ''
+    for i, char in enumerate(name):
+        if char == '.' and i > 0:
+            yield (folder, name[:i]), name[i:]
+
+def index_sidecars(groups):
+    """
+    Build the sidecar index from the scanner's extension groups, replacing any previous index.
+
+    Every file is indexed under each base name it can have (e.g. a.ERS.aux.xml under a, a.ERS and a.ERS.aux),
+    so companions are found with dictionary lookups instead of one existence check per candidate extension.
+    The folders holding the files (e.g. .gdb folders) are indexed too.
+    """
+    global _index
+    _index = {}
+    folders = set()
+    for paths in groups.values():
+        for path in paths:
+            folders.add(os.path.dirname(os.path.normpath(path)))
+            for key, suffix in _index_keys(path):
+                _index.setdefault(key, {})[suffix] = path
+    for folder in folders:
+        for key, suffix in _index_keys(folder):
+            _index.setdefault(key, {}).setdefault(suffix, folder)
+
+def find_sidecars(base_name, associated_exts):
+    """
+    Return the existing files named base_name + ext, in the order of associated_exts.
+
+    Uses the sidecar index when one has been built, and checks the filesystem otherwise.
+    """
+    if _index is None:
+        candidates = (base_name if ext == '' else base_name + ext for ext in associated_exts)
+        return [path for path in candidates if os.path.exists(path)]
+
+    found = _index.get((os.path.dirname(os.path.normpath(base_name)), os.path.basename(base_name)), {})
+    return [found[ext] for ext in associated_exts if ext in found]
+
+def _forget(path):
+    """Drop a moved path from the sidecar index."""
+    if _index is None:
+        return
+    for key, suffix in _index_keys(path):
+        found = _index.get(key)
+        if found is not None and found.get(suffix) == path:
+            del found[suffix]
+
+def _folder_device(folder):
+    if folder not in _folder_devices:
+        _folder_devices[folder] = os.stat(folder).st_dev
+    return _folder_devices[folder]
+
+def move_batch(sources, target_folder):
+    """
+    Move a group of files into a folder, with a single rename each when they are on the target's filesystem.
+
+    Sizes are taken from the stat made before the move, so the moved files are not stat'ed again.
+    Sources that no longer exist are skipped.
+
+    Returns:
+    list of tuples: (source, destination, size in bytes) for each file moved.
+    """
+    moves = []
+    target_device = _folder_device(target_folder)
+    for source in sources:
+        destination = os.path.join(target_folder, os.path.basename(source))
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            continue
+
+        if stat.st_dev == target_device:
+            # Like shutil.move, never replace a file already in the target folder
+            if os.path.lexists(destination):
+                raise shutil.Error(f"Destination path '{destination}' already exists")
+            os.rename(source, destination)
+        else:
+            shutil.move(source, target_folder)
+
+        _forget(source)
+        moves.append((source, destination, stat.st_size))
+    return moves
@@ -0,0 +1,103 @@
+import csv
+import io
+from contextlib import contextmanager
+
+# Output formats for converted tables and the file extension each one is written with
+OUTPUT_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Line ending of every CSV line, the one pyarrow's CSV writer uses
+CSV_LINE_TERMINATOR = '\n'
+
+def output_extension(output_format):
+    """Return the file extension used for an output format."""
+    return OUTPUT_EXTENSIONS[output_format]
+
+@contextmanager
+def columnar_writer(output_path, output_format, compression='zstd'):
+    """
+    Open a typed, compressed columnar file (Parquet or Feather) for writing in blocks.
+
+    pyarrow is only imported here, so it is only needed when a columnar format is requested.
+
+    Args:
+    output_path (str): Path of the file to write.
+    output_format (str): 'parquet' or 'feather'.
+    compression (str): Column compression codec.
+
+    Yields:
+    function: write(columns), where columns is a dict of column name -> 1D numpy array.
+              Every block must have the same columns and dtypes as the first one.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if output_format not in ('parquet', 'feather'):
+        raise ValueError(f"Unsupported columnar output format: {output_format}")
+
+    writer = None
+
+    def write(columns):
+        nonlocal writer
+        table = pa.table(columns)
+        if writer is None:
+            if output_format == 'parquet':
+                writer = pq.ParquetWriter(output_path, table.schema, compression=compression)
+            else:
+                # Feather V2 is the Arrow IPC file format
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                writer = pa.ipc.new_file(output_path, table.schema, options=options)
+        writer.write_table(table)
+
+    try:
+        yield write
+    finally:
+        if writer is not None:
+            writer.close()
+
+@contextmanager
+def csv_table_writer(output_path, headers):
+    """
+    Open a CSV file for writing typed column blocks, with the header line csv.writer produces.
+
+    Blocks are formatted by pyarrow's C++ CSV writer when it is installed, and by pandas otherwise.
+    Either way, lines end with '\n' and missing values (including NaN floats) are written as empty fields.
+
+    Yields:
+    function: write(columns), where columns is a dict of column name -> 1D array, in header order.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa = None
+
+    header = io.StringIO()
+    csv.writer(header, lineterminator=CSV_LINE_TERMINATOR).writerow(headers)
+
+    with open(output_path, 'wb') as csv_file:
+        csv_file.write(header.getvalue().encode('utf-8'))
+
+        def write(columns):
+            if pa is not None:
+                # from_pandas turns NaN into nulls, which are written as empty fields like pandas writes NaN
+                table = pa.table({name: pa.array(values, from_pandas=True) for name, values in columns.items()})
+                pa_csv.write_csv(table, csv_file, write_options=pa_csv.WriteOptions(include_header=False))
+            else:
+                import pandas as pd
+                csv_file.write(pd.DataFrame(columns).to_csv(header=False, index=False, lineterminator=CSV_LINE_TERMINATOR).encode('utf-8'))
+
+        yield write
+
+@contextmanager
+def open_table_writer(output_path, output_format, headers):
+    """Open a block writer (see csv_table_writer and columnar_writer) for the requested output format."""
+    if output_format == 'csv':
+        with csv_table_writer(output_path, headers) as write:
+            yield write
+    else:
+        with columnar_writer(output_path, output_format) as write:
+            yield write
@@ -1,30 +1,50 @@
 import os
-import shutil
+import time
+from sidecars import find_sidecars, move_batch
+from instrumentation import record_file_time
 
-def move_files(file_path, associated_exts, target_folder, total_size_kb):
+def new_result():
+    """
+    Create the result dict returned by every processing handler.
+
+    Keys:
+    files (int): Number of files the handler processed.
+    skipped (int): Number of files skipped because they were empty.
+    size_kb (float): Total size of the files moved (each file counted once, companions included), in kB.
+    moved (list of str): Source paths moved out of the data folder (used to avoid handing them to later handlers).
+    failed (list of str): Source paths whose conversion failed; they are left in place for a later run.
+    outputs (dict): Normalized path passed to move_files mapped to the destination paths it moved.
+    unchanged (int): Number of files skipped because the manifest shows them unchanged since they were processed.
+    duplicates (int): Number of files skipped because they are byte-identical to a file already processed.
+    """
+    return {'files': 0, 'skipped': 0, 'size_kb': 0.0, 'moved': [], 'failed': [], 'outputs': {}, 'unchanged': 0, 'duplicates': 0}
+
+def move_files(file_path, associated_exts, target_folder, result):
     base_name = os.path.splitext(file_path)[0]
 
-    # Iterate over possible associated extensions (including empty extension)
-    for ext in associated_exts:
-        associated_file = base_name if ext == '' else base_name + ext
-        
-        if os.path.exists(associated_file):
-            destination_file = os.path.join(target_folder, os.path.basename(associated_file))
-            # if ext.endswith('.xml'):
-            #     prettify_xml(associated_file)
-            shutil.move(associated_file, target_folder)
-            print(f"Moved {associated_file} to {destination_file}")
-            total_size_kb += os.path.getsize(destination_file) / 1024  # KB
-            
-    return total_size_kb
+    # Look up the associated files that exist (the empty extension is the base name itself) and move them together
+    start = time.perf_counter()
+    associated_files = find_sidecars(base_name, associated_exts)
+    moves = move_batch(associated_files, target_folder)
+    record_file_time(file_path, 'move', time.perf_counter() - start)
+
+    for associated_file, destination_file, size in moves:
+        # if associated_file.endswith('.xml'):
+        #     prettify_xml(associated_file)
+        print(f"Moved {associated_file} to {destination_file}")
+        result['size_kb'] += size / 1024  # KB
+        result['moved'].append(associated_file)
+        result['outputs'].setdefault(os.path.normpath(file_path), []).append(destination_file)
+
+    return result
 
 
 def count_folders(processed_folder_path):
     """
     Counts the number of distinct folders created inside the 'processed' folder.
-    
+
     Args:
-    processed_folder_path (str): The path to the 'processed' folder, relative or absolute. 
+    processed_folder_path (str): The path to the 'processed' folder, relative or absolute.
                                  Default is 'processed', assumed to be one level below the script's root.
 
     Returns: